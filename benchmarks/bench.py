@@ -0,0 +1,240 @@
+"""
+Benchmarks of every step of the set commitment, SPSEQ-UC signature, zkp and DAC schemes.
+Each step is timed for a sweep of max cardinality (t), number of message sets, subset sizes and delegation
+depths, and the results are written as JSON (seconds per operation, ops/sec and percentiles).
+A saved result can be given as a baseline to report steps that got slower.
+
+    python -m benchmarks.bench --max-cardinal 5 10 --sets 2 4 --out results.json
+    python -m benchmarks.bench --max-cardinal 5 10 --sets 2 4 --compare results.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from petlib.bn import Bn
+from core.dac import DAC
+from core.zkp import ZKP_Schnorr_FS
+
+
+def percentile(sorted_times, p):
+    """ the nearest-rank percentile p (0-100) of sorted times """
+    k = max(0, min(len(sorted_times) - 1, int(round(p / 100 * len(sorted_times))) - 1))
+    return sorted_times[k]
+
+
+def measure(fn, repeat, warmup=1):
+    """
+    Times a function.
+
+    :param fn: a function without arguments, it is called warmup + repeat times
+    :param repeat: number of timed calls
+    :param warmup: number of calls before timing
+    :return: statistics of the times in seconds
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    mean = sum(times) / len(times)
+    return {"runs": repeat, "mean": mean, "ops_per_sec": 1 / mean if mean > 0 else float("inf"),
+            "min": times[0], "p50": percentile(times, 50), "p90": percentile(times, 90),
+            "p99": percentile(times, 99), "max": times[-1]}
+
+
+def message_set(index, size):
+    """ a message set of size messages, a scheme of max cardinality t commits to sets of at most t - 1 messages """
+    return ["attribute %d.%d = value %d" % (index, i, i) for i in range(size)]
+
+
+def delegate_chain(dac, pp_dac, cred, secret, depth, l_start, set_size=2):
+    """
+    Delegates a credential depth times, each time adding one message set and keeping the (randomized) update
+    key so that the next delegatee can delegate again.
+
+    :param set_size: number of messages of each added set
+
+    :return: the last credential (sigma, update_key, commitment_vector, opening_vector) and its nym
+    """
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+    order = pp_sign[4]
+    (sigma, update_key, commitment_vector, opening_vector) = cred
+    nym = None
+    for hop in range(depth):
+        (usk_R, upk_R) = dac.user_keygen(pp_dac)
+        (nym_R, secret_nym_R, proof_nym_R) = dac.nym_gen(pp_dac, usk_R, upk_R)
+        cred_R = dac.delegator(pp_dac, (sigma, update_key, list(commitment_vector), list(opening_vector)),
+                               message_set(l_start + hop, set_size), l=l_start + hop, sk_u=secret, proof_nym=proof_nym_R)
+        (sigma_orpha, commitment_L, opening_L, commitment_vector, opening_vector) = cred_R
+        sigma_change = dac.spseq_uc.receive_convert_sig(vk_ca, secret_nym_R, sigma_orpha)
+        # mu = 1 so that the commitments added by the next hop match the randomized update key
+        psi = order.random()
+        (sigma, update_key, commitment_vector, opening_vector, nym, chi) = dac.spseq_uc.change_rep(
+            pp_sign, vk_ca, nym_R, commitment_vector, opening_vector, sigma_change, Bn(1), psi, B=True, update_key=update_key)
+        secret = (psi * (secret_nym_R + chi)) % order
+    return (sigma, update_key, commitment_vector, opening_vector), nym
+
+
+def run_benchmarks(max_cardinals, sets, subset_sizes, depths, repeat, table_budget=None, log=None):
+    """
+    Runs the benchmarks for every combination of the parameters that a step depends on.
+
+    :return: a list of results, each with the step name, its parameters and the statistics of measure
+    """
+    results = []
+
+    def bench(name, params, fn):
+        stats = measure(fn, repeat)
+        results.append(dict(name=name, params=params, **stats))
+        if log is not None:
+            log("%-28s %-48s %10.2f ops/sec" % (name, json.dumps(params, sort_keys=True), stats["ops_per_sec"]))
+
+    # the update key for k_prime = sets + depth uses the signing key at index k_prime + 1
+    l_message = max(sets) + max(depths) + 2
+    for t in max_cardinals:
+        dac = DAC(t=t, l_message=l_message, table_budget=table_budget)
+        (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = dac.setup()
+        (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+        order = pp_sign[4]
+        setcommit, spseq_uc = dac.setcommit, dac.spseq_uc
+
+        # the polynomial of a set of size messages has size + 1 coefficients, one per base of the t bases
+        size = t - 1
+
+        # set commitments
+        mess_set = message_set(0, size)
+        (commitment, open_info) = setcommit.commit_set(pp_sign, mess_set)
+        bench("commit_set", {"t": t}, lambda: setcommit.commit_set(pp_sign, mess_set))
+        for s in subset_sizes:
+            if s >= size:
+                continue
+            subset = mess_set[:s]
+            witness = setcommit.open_subset(pp_sign, mess_set, open_info, subset)
+            bench("open_subset", {"t": t, "subset": s}, lambda: setcommit.open_subset(pp_sign, mess_set, open_info, subset))
+            bench("verify_subset", {"t": t, "subset": s}, lambda: setcommit.verify_subset(pp_sign, commitment, subset, witness))
+
+            # cross set commitments over n sets
+            for n in sets:
+                # the union of the subsets is a set of the same parameters
+                if n * s > size:
+                    continue
+                messages = [message_set(i, size) for i in range(n)]
+                commits = [setcommit.commit_set(pp_sign, mess) for mess in messages]
+                commit_vector = [c for (c, o) in commits]
+                subsets = [mess[:s] for mess in messages]
+                witness_vector = [setcommit.open_subset(pp_sign, messages[i], commits[i][1], subsets[i]) for i in range(n)]
+                proof = setcommit.aggregate_cross(witness_vector, commit_vector)
+                params = {"t": t, "sets": n, "subset": s}
+                bench("aggregate_cross", params, lambda: setcommit.aggregate_cross(witness_vector, commit_vector))
+                bench("verify_cross", params, lambda: setcommit.verify_cross(pp_sign, commit_vector, subsets, proof))
+
+        # signatures
+        for n in sets:
+            messages = [message_set(i, size) for i in range(n)]
+            (sk_u, pk_u) = spseq_uc.user_keygen(pp_sign)
+            params = {"t": t, "sets": n}
+            bench("sign", params, lambda: spseq_uc.sign(pp_sign, pk_u, sk_ca, messages))
+            (sigma, update_key, commitment_vector, opening_vector) = spseq_uc.sign(pp_sign, pk_u, sk_ca, messages, k_prime=n + 1)
+            bench("verify", params, lambda: spseq_uc.verify(pp_sign, vk_ca, pk_u, commitment_vector, sigma))
+            bench("change_rep", params, lambda: spseq_uc.change_rep(pp_sign, vk_ca, pk_u, commitment_vector, opening_vector,
+                                                                    sigma, order.random(), order.random(), B=True, update_key=update_key))
+            bench("change_rel", params, lambda: spseq_uc.change_rel(pp_sign, message_set(n, size), n + 1, sigma, list(commitment_vector),
+                                                                    list(opening_vector), update_key))
+
+        # zero-knowledge proofs
+        nizkp = ZKP_Schnorr_FS(pp_sign[5])
+        x = order.random()
+        stm = x * pp_nizkp[1]
+        nizk_proof = nizkp.non_interact_prove(pp_nizkp, stm, x)
+        bench("schnorr_fs_prove", {"t": t}, lambda: nizkp.non_interact_prove(pp_nizkp, stm, x))
+        bench("schnorr_fs_verify", {"t": t}, lambda: nizkp.non_interact_verify(pp_nizkp, stm, nizk_proof))
+        (usk, upk) = dac.user_keygen(pp_dac)
+        (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk, upk)
+        bench("nym_gen", {"t": t}, lambda: dac.nym_gen(pp_dac, usk, upk))
+        bench("damgard_verify", {"t": t}, lambda: dac.zkp.verify(*proof_nym_u, pp_pedersen=pp_zkp))
+
+        # DAC flows
+        for n in sets:
+            messages = [message_set(i, size) for i in range(n)]
+            params = {"t": t, "sets": n}
+            bench("issue_cred", params, lambda: dac.issue_cred(pp_dac, messages, sk_ca, nym_u, None, proof_nym_u))
+            for d in depths:
+                cred = dac.issue_cred(pp_dac, messages, sk_ca, nym_u, n + d, proof_nym_u)
+                bench("delegate_chain", dict(params, depth=d),
+                      lambda: delegate_chain(dac, pp_dac, cred, secret_nym_u, d, n + 1, min(2, size)))
+            cred = dac.issue_cred(pp_dac, messages, sk_ca, nym_u, None, proof_nym_u)
+            for s in subset_sizes:
+                if s >= size or n * s > size:
+                    continue
+                D = [mess[:s] for mess in messages]
+                proof = dac.proof_cred(pp_dac, nym_u, secret_nym_u, cred, messages, D)
+                bench("proof_cred", dict(params, subset=s), lambda: dac.proof_cred(pp_dac, nym_u, secret_nym_u, cred, messages, D))
+                bench("verify_proof", dict(params, subset=s), lambda: dac.verify_proof(pp_dac, proof, D))
+    return results
+
+
+def _key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares results to a baseline by the mean time of each step.
+
+    :param threshold: relative slowdown (e.g. 0.1 for 10%) above which a step counts as a regression
+    :return: a list of (name, params, baseline mean, mean, ratio, regressed) for the steps in both
+    """
+    baseline_by_key = {_key(result): result for result in baseline}
+    rows = []
+    for result in results:
+        base = baseline_by_key.get(_key(result))
+        if base is None:
+            continue
+        ratio = result["mean"] / base["mean"]
+        rows.append((result["name"], result["params"], base["mean"], result["mean"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the DAC scheme.")
+    parser.add_argument("--max-cardinal", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--sets", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--subset-sizes", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--table-budget", type=int, default=None, help="bytes for fixed-base tables of the parameters")
+    parser.add_argument("--out", help="write the results as JSON to this file, stdout by default")
+    parser.add_argument("--compare", help="a JSON file of earlier results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    log = lambda line: print(line, file=sys.stderr)
+    results = run_benchmarks(args.max_cardinal, args.sets, args.subset_sizes, args.depths, args.repeat,
+                             args.table_budget, log)
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args), "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        rows = compare(results, baseline, args.threshold)
+        for (name, params, base_mean, mean, ratio, regressed) in rows:
+            print("%-28s %-48s %9.3fms -> %9.3fms  x%.2f%s" % (name, json.dumps(params, sort_keys=True), base_mean * 1e3,
+                                                            mean * 1e3, ratio, "  REGRESSION" if regressed else ""))
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+The parameters a scheme object works with: the bilinear group, its order and the max cardinality t. Each
+SetCommitment, EQC_Sign and DAC object keeps its own Context, so objects with different t can be used in one
+process. Bilinear groups are created once per curve and shared (see shared_group), since BpGroup holds the
+precomputation of the generators.
+"""
+
+from threading import Lock
+from bplib.bp import BpGroup
+
+## the shared bilinear groups by curve nid, see shared_group
+_groups = {}
+_groups_lock = Lock()
+
+
+def shared_group(nid=None):
+    """
+    :param nid: the curve of the group, the default curve of BpGroup if none
+    :return: the BpGroup of the curve, created once per process
+    """
+    with _groups_lock:
+        if nid not in _groups:
+            group = BpGroup() if nid is None else BpGroup(nid)
+            _groups[nid] = group
+            _groups.setdefault(group.nid, group)
+        return _groups[nid]
+
+
+class Context:
+    """ the bilinear group, its order and the max cardinality of a scheme object """
+
+    def __init__(self, max_cardinality, group=None):
+        """
+        :param max_cardinality: the max cardinality t of the message sets
+        :param group: bilinear group BpGroup, the shared group by default
+        """
+        self.max_cardinality = max_cardinality
+        self.group = group if group is not None else shared_group()
+        self.order = self.group.order()
+
+    def __repr__(self):
+        return "Context(max_cardinality=%d, nid=%d)" % (self.max_cardinality, self.group.nid)
@@ -6,41 +6,50 @@ See  the following for the details:
 @Author: Omid Mir
 """
 
-from bplib.bp import BpGroup
-from core.set_commit import CrossSetCommitment
-from core.spseq_uc import EQC_Sign
+import time
+from collections import OrderedDict
+from threading import Lock
+from core.set_commit import CrossSetCommitment, witness_polynomial
+from core.spseq_uc import EQC_Sign, PreparedVerificationKey
 from core.zkp import ZKP_Schnorr_FS, Damgard_Transfor
+from core.util import combine_equations, pairing_check
+from core.context import Context
+
+## the max number of prepared verification keys a DAC object keeps
+MAX_PREPARED_VKS = 16
 
 class DAC:
-    def __init__(self, t, l_message):
+    def __init__(self, t, l_message, table_budget=None, group=None):
         """
         Initialize the DAC scheme.
 
-        :param group: bilinear group BpGroup
         :param t: max cardinality
         :param l_message: the max number of the messages
+        :param table_budget: bytes that fixed-base tables of the public parameters may use, none by default
+        :param group: bilinear group BpGroup, the shared group by default (see context.py)
 
         :return: public parameters including sign and set comment and zkp, and object of SC and sign and zkp schemes
         """
-        global group, order
-        group = BpGroup()
-        order = BpGroup().order()
+        self.context = Context(t, group)
         self.t = t
         self.l_message = l_message
+        self.table_budget = table_budget
         # create objects of underlines schemes
-        self.spseq_uc = EQC_Sign(t)
-        self.setcommit = CrossSetCommitment(t)
-        self.nizkp = ZKP_Schnorr_FS(group)
-        self.zkp = Damgard_Transfor(group)
+        self.spseq_uc = EQC_Sign(t, self.context)
+        self.setcommit = CrossSetCommitment(t, self.context)
+        self.nizkp = ZKP_Schnorr_FS(self.context.group)
+        self.zkp = Damgard_Transfor(self.context.group)
+        self.prepared_vks = OrderedDict()
+        self.prepared_vks_lock = Lock()
 
     def setup(self):
         """
          the DAC scheme public parameters
         """
         # create public parameters and signing pair keys
-        pp_sign, alpha = self.spseq_uc.setup()
+        pp_sign, alpha = self.spseq_uc.setup(self.table_budget)
         (sk_ca, vk_ca) = self.spseq_uc.sign_keygen(pp_sign, l_message=self.l_message)
-        pp_zkp = self.zkp.setup(group)
+        pp_zkp = self.zkp.pp_pedersen
         pp_nizkp = self.nizkp.setup()
         (G, g, o) = pp_nizkp
 
@@ -77,6 +86,7 @@ class DAC:
         """
         (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
         (G, g, o, h) = pp_zkp
+        order = self.context.order
         # pick randomness
         psi, chi = order.random(), order.random()
 
@@ -85,9 +95,9 @@ class DAC:
         secret_wit = psi * (usk + chi)
 
         # create a proof for nym
-        (pedersen_commit, pedersen_open) = self.zkp.announce()
+        (pedersen_commit, pedersen_open) = self.zkp.announce(pp_zkp)
         (open_randomness, announce_randomnes, announce_element) = pedersen_open
-        state = ['schnorr', g, h, pedersen_commit.__hash__()]
+        state = ['schnorr', g, h, pedersen_commit]
         challenge = self.zkp.challenge(state)
         response = self.zkp.response(challenge, announce_randomnes, stm=nym, secret_wit=secret_wit)
         proof_nym_u = (challenge, pedersen_open, pedersen_commit, nym, response)
@@ -111,7 +121,7 @@ class DAC:
         challenge, pedersen_open, pedersen_commit, stm, response = proof_nym_u
 
         # check if proof of nym is correct
-        if self.zkp.verify(challenge, pedersen_open, pedersen_commit, stm, response) == True:
+        if self.zkp.verify(challenge, pedersen_open, pedersen_commit, stm, response, pp_zkp) == True:
             # check if delegate keys is provided
             if k_prime != None:
                 (sigma, update_key, commitment_vector, opening_vector) = self.spseq_uc.sign(pp_sign, nym_u, sk, attr_vector, k_prime)
@@ -127,7 +137,46 @@ class DAC:
         else:
             raise ValueError("proof of nym is not valid ")
 
-    def proof_cred(self, pp_dac, nym_R, aux_R, cred_R, Attr, D):
+    def issue_cred_batch(self, pp_dac, requests, sk):
+        """
+        Issues root credentials to many users (see issue_cred), signing them with EQC_Sign.sign_batch and checking
+        all signatures in one batch.
+
+        :param pp_dac: public parameters
+        :param requests: a list of (attr_vector, nym_u, proof_nym_u, k_prime), k_prime can be None
+        :param sk: signing key sk_ca in paper
+
+        :return: a list of credentials, with None for a request whose proof of nym is not valid or whose k_prime is
+            not greater than the number of its attributes sets (see sign_batch), and the timing of the batch as a dict
+        """
+        (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+        start = time.perf_counter()
+
+        # check the proofs of nym in one batch and sign the requests with valid ones
+        verdicts = self.zkp.verify_batch([proof_nym_u for (attr_vector, nym_u, proof_nym_u, k_prime) in requests], pp_zkp)
+        valid = [i for i in range(len(requests)) if verdicts[i]]
+        checked = time.perf_counter()
+        (signed, sign_timing) = self.spseq_uc.sign_batch(pp_sign, [(requests[i][1], requests[i][0], requests[i][3]) for i in valid], sk)
+        # sign_batch gives None for a bad k_prime, as sign does
+        valid = [i for i, cred in zip(valid, signed) if cred is not None]
+        signed = [cred for cred in signed if cred is not None]
+
+        # check all signatures at once
+        prepared_vk = self.prepared_vk(pp_sign, vk_ca)
+        equations = [[prepared_vk.verify_equation(requests[i][1], cred[-2], cred[0])] for i, cred in zip(valid, signed)]
+        if not all(self.check_equations_batch(pp_dac, equations)):
+            raise ValueError("signature/credential is not correct")
+
+        creds = [None] * len(requests)
+        for i, cred in zip(valid, signed):
+            creds[i] = cred
+        end = time.perf_counter()
+        timing = {"count": len(requests), "issued": len(valid), "seconds": end - start, "nym_seconds": checked - start,
+                  "sign_seconds": sign_timing["seconds"], "verify_seconds": end - checked - sign_timing["seconds"],
+                  "seconds_per_credential": (end - start) / max(len(requests), 1)}
+        return creds, timing
+
+    def proof_cred(self, pp_dac, nym_R, aux_R, cred_R, Attr, D, executor=None, pool=None):
         """
             Generates proof of a credential for a given pseudonym and selective disclosure D.
 
@@ -137,34 +186,49 @@ class DAC:
         :param cred_R: credential of pseudonym R that is needed to prove
         :param Attr: attributes vector in credential R
         :param D: the subset of attributes (selective disclose)
+        :param executor: an optional concurrent.futures executor (e.g. a process pool) that computes the witness
+            polynomials of the sets in parallel
+        :param pool: an optional RandomizerPool of pp_dac (see randomizer.py) that gives the randomness, the
+            announcement and the challenge computed ahead of time
 
         :return: a proof of credential that is a credential P
         """
         (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
         (G, g, o, h) = pp_zkp
+        order = self.context.order
         (sigma, commitment_vector, opening_vector) = cred_R
-        # pick randomness
-        mu, psi = order.random(), order.random()
+        if pool is not None:
+            if pool.pp_dac[3] != vk_ca or pool.pp_dac[1][3] != h:
+                raise ValueError("the randomizer pool is for other public parameters")
+            (mu, psi, offline, (pedersen_commit, pedersen_open, challenge)) = pool.take()
+        else:
+            # pick randomness
+            mu, psi, offline = order.random(), order.random(), None
         # run change rep to randomize credential and user pk (i.e., create a new nym)
         (sigma_prime, rndmz_commitment_vector, rndmz_opening_vector, nym_P, chi) = self.spseq_uc.change_rep \
-            (pp_sign, vk_ca, nym_R, commitment_vector, opening_vector, sigma, mu, psi, B=False, update_key=None)
+            (pp_sign, vk_ca, nym_R, commitment_vector, opening_vector, sigma, mu, psi, B=False, update_key=None,
+             offline=offline)
 
-        # create an announcement
-        (pedersen_commit, pedersen_open) = self.zkp.announce()
-        (open_randomness, announce_randomnes, announce_element) = pedersen_open
+        if pool is None:
+            # create an announcement
+            (pedersen_commit, pedersen_open) = self.zkp.announce(pp_zkp)
 
-        # get a challenge
-        state = ['schnorr', g, h, pedersen_commit.__hash__()]
-        challenge = self.zkp.challenge(state)
+            # get a challenge
+            state = ['schnorr', g, h, pedersen_commit]
+            challenge = self.zkp.challenge(state)
+        (open_randomness, announce_randomnes, announce_element) = pedersen_open
 
         # prover creates a respoonse (or proof)
-        response = self.zkp.response(challenge, announce_randomnes, stm=nym_P, secret_wit= (aux_R + chi) * psi )
+        response = self.zkp.response(challenge, announce_randomnes, stm=nym_P, secret_wit=(aux_R + chi).mod_mul(psi, order))
         proof_nym_p = (challenge, pedersen_open, pedersen_commit, nym_P, response)
 
-        # create a witness for the attributes set that needed to be disclosed
-        Witness = [self.setcommit.open_subset(pp_sign, Attr[i], rndmz_opening_vector[i], D[i]) for i in range(len(D))]
+        # create the witness polynomials of all attributes sets that needed to be disclosed, and their aggregate witness
+        map_fn = map if executor is None else executor.map
+        witness_coeffs = list(map_fn(witness_polynomial, Attr[:len(D)], D, [int(order)] * len(D)))
+        if None in witness_coeffs:
+            raise ValueError("D is not a subset of the attributes")
         list_C = [rndmz_commitment_vector[i] for i in range(len(D))]
-        Witness_pi = self.setcommit.aggregate_cross(Witness, list_C)
+        Witness_pi = self.setcommit.aggregate_polynomials(pp_sign, witness_coeffs, rndmz_opening_vector, list_C)
 
         # output the whole proof
         proof = (sigma_prime, rndmz_commitment_vector, nym_P, Witness_pi, proof_nym_p)
@@ -189,8 +253,98 @@ class DAC:
 
         # check the proof is valid for D
         return self.setcommit.verify_cross(pp_sign, list_C, D, Witness_pi) and \
-                self.zkp.verify(challenge, pedersen_open, pedersen_commit, nym_P, response) and self.spseq_uc.verify(pp_sign,    vk_ca, nym_P, rndmz_commitment_vector,sigma_prime) == True
+                self.zkp.verify(challenge, pedersen_open, pedersen_commit, nym_P, response, pp_zkp) and \
+                self.prepared_vk(pp_sign, vk_ca).verify(nym_P, rndmz_commitment_vector, sigma_prime) == True
+
+
+    def prepared_vk(self, pp_sign, vk_ca):
+        """
+        Gives the prepared verification key of vk_ca, prepared once and cached per verification key (for the most
+        recently used issuers). The cache can be used from several threads, e.g. by the schemas of a Registry.
+
+        :param pp_sign: signature public parameters
+        :param vk_ca: verification key of an issuer
+
+        :return: a PreparedVerificationKey
+        """
+        key = tuple(X.export() for X in vk_ca)
+        with self.prepared_vks_lock:
+            prepared_vk = self.prepared_vks.get(key)
+            if prepared_vk is not None:
+                self.prepared_vks.move_to_end(key)
+                return prepared_vk
+        prepared_vk = PreparedVerificationKey(pp_sign, vk_ca)
+        with self.prepared_vks_lock:
+            self.prepared_vks[key] = prepared_vk
+            if len(self.prepared_vks) > MAX_PREPARED_VKS:
+                self.prepared_vks.popitem(last=False)
+        return prepared_vk
+
+    def verify_proofs_batch(self, pp_dac, proofs, Ds):
+        """
+        verify many proofs of credentials at once. The pairing equations of all proofs are combined with small
+        random exponents into a single pairing product; if the batch fails it is bisected to find the invalid proofs.
+
+        :param pp_dac:public parameters
+        :param proofs: a list of proofs of credentials
+        :param Ds: a list of subset attributes, one for each proof
 
+        :return: a list of 0/1, one for each proof
+        """
+        (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+        nym_verdicts = self.zkp.verify_batch([proof[4] for proof in proofs], pp_zkp)
+        equations = [self.proof_equations(pp_dac, proofs[i], Ds[i], check_nym=False) if nym_verdicts[i] else None
+                     for i in range(len(proofs))]
+        return self.check_equations_batch(pp_dac, equations)
+
+    def proof_equations(self, pp_dac, proof, D, check_nym=True):
+        """
+        Checks the proof of nym of a proof of credential (which is cheap) and gives the pairing equations of the
+        proof, so that invalid proofs are dropped before any pairing.
+
+        :param pp_dac:public parameters
+        :param proof: a proof of credential satisfied subset attributes D
+        :param D: subset attributes
+        :param check_nym: check the proof of nym, which can be skipped if it was checked already (see verify_batch)
+
+        :return: a list of equations, each a list of (G1, G2) pairs, or None if the proof of nym is not valid
+        """
+        (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+        (sigma_prime, rndmz_commitment_vector, nym_P, Witness_pi, proof_nym_p) = proof
+        (challenge, pedersen_open, pedersen_commit, nym_P, response) = proof_nym_p
+        if check_nym and not self.zkp.verify(challenge, pedersen_open, pedersen_commit, nym_P, response, pp_zkp):
+            return None
+        list_C = [rndmz_commitment_vector[j] for j in range(len(D))]
+        return [self.setcommit.verify_cross_equation(pp_sign, list_C, D, Witness_pi),
+                self.prepared_vk(pp_sign, vk_ca).verify_equation(nym_P, rndmz_commitment_vector, sigma_prime)]
+
+    def check_equations_batch(self, pp_dac, equations):
+        """
+        Checks the equations of many proofs at once (see proof_equations), bisecting a failing batch.
+
+        :param pp_dac:public parameters
+        :param equations: a list with the equations of each proof, None for a proof that is already rejected
+
+        :return: a list of 0/1, one for each proof
+        """
+        (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+        verdicts = [False] * len(equations)
+        self._verify_batch_bisect(pp_sign, equations, [i for i in range(len(equations)) if equations[i] is not None], verdicts)
+        return verdicts
+
+    def _verify_batch_bisect(self, pp_sign, equations, indices, verdicts):
+        """ checks the combined equations of proofs in indices, and splits the batch in halves if it fails """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
+        if len(indices) == 0:
+            return
+        pairs = combine_equations([equation for i in indices for equation in equations[i]])
+        if pairing_check(group, pairs):
+            for i in indices:
+                verdicts[i] = True
+        elif len(indices) > 1:
+            half = len(indices) // 2
+            self._verify_batch_bisect(pp_sign, equations, indices[:half], verdicts)
+            self._verify_batch_bisect(pp_sign, equations, indices[half:], verdicts)
 
     """
     This is the delegation phase or the issuing credential protocol in the paper between the delegator and delegatee. 
@@ -213,7 +367,7 @@ class DAC:
         challenge, pedersen_open, pedersen_commit, stm, response = proof_nym
 
         # check the proof
-        assert self.zkp.verify(challenge, pedersen_open, pedersen_commit, stm, response)
+        assert self.zkp.verify(challenge, pedersen_open, pedersen_commit, stm, response, pp_zkp)
 
         (sigma, update_key, commitment_vector, opening_vector) = cred_u
         # run change rep to add an attributes set l into the credential
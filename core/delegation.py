@@ -0,0 +1,211 @@
+"""
+An asyncio driver for the interactive delegation protocol of DAC (delegator and delegatee) between a user U
+that delegates a credential and a user R that receives it:
+
+    R -> U : PROOF_NYM record (nym_R, proof of nym_R)
+    U      : checks the proof of nym, change_rel and send_convert_sig
+    U -> R : DELEGATION record (cred_R, A_l), or ABORT record (reason)
+    R      : receive_convert_sig and change_rep
+
+Messages are records of wire.py sent over a transport (MemoryTransport for tests, StreamTransport for asyncio
+streams). The group operations run in a pool of worker processes, which load the public parameters once from a
+file written by storage.save_setup, so the event loop is never blocked by them. Every session has a timeout.
+"""
+
+import asyncio
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from core.dac import DAC
+from core.storage import load_setup
+from core.util import to_bn
+from core.wire import encode, decode, read_header, HEADER_SIZE, CRED, PROOF_NYM, DELEGATION, ABORT
+
+## states of a session
+STARTED, WAIT_NYM, DELEGATING, WAIT_CRED, CONVERTING, DONE, FAILED = \
+    "started", "wait_nym", "delegating", "wait_cred", "converting", "done", "failed"
+
+## state of a worker process, set by _init_worker
+_worker = None
+
+
+def _init_worker(setup_path, t, l_message):
+    global _worker
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = load_setup(setup_path)
+    dac = DAC(t=t, l_message=l_message)
+    _worker = (dac, pp_dac)
+
+
+def _delegator_step(cred_record, A_l, l, sk_u, nym_record):
+    """ the delegator part in a worker, gives a DELEGATION record, raises ValueError if the proof of nym is not valid """
+    (dac, pp_dac) = _worker
+    (kind, cred_u) = decode(cred_record, CRED)
+    (kind, (nym_R, proof_nym_R)) = decode(nym_record, PROOF_NYM)
+    # checked here rather than by the assert of DAC.delegator, which is removed when Python runs with -O
+    if not dac.zkp.verify(*proof_nym_R, pp_pedersen=pp_dac[1]):
+        raise ValueError("proof of nym is not valid")
+    cred_R = dac.delegator(pp_dac, cred_u, A_l, l, to_bn(sk_u), proof_nym_R)
+    return encode(DELEGATION, (cred_R, A_l))
+
+
+def _delegatee_step(delegation_record, sk_R, nym_record):
+    """ the delegatee part in a worker, gives a CRED record of (sigma, commitment_vector, opening_vector, nym, chi) """
+    (dac, pp_dac) = _worker
+    (kind, (cred_R, A_l)) = decode(delegation_record, DELEGATION)
+    (kind, (nym_R, proof_nym_R)) = decode(nym_record, PROOF_NYM)
+    return encode(CRED, dac.delegatee(pp_dac, cred_R, A_l, to_bn(sk_R), nym_R))
+
+
+class MemoryTransport:
+    """ one end of an in-memory connection, see MemoryTransport.pair """
+
+    def __init__(self, incoming, outgoing):
+        self.incoming = incoming
+        self.outgoing = outgoing
+
+    @staticmethod
+    def pair():
+        """ :return: the two ends of a new connection """
+        (a, b) = (asyncio.Queue(), asyncio.Queue())
+        return MemoryTransport(a, b), MemoryTransport(b, a)
+
+    async def send(self, record):
+        await self.outgoing.put(bytes(record))
+
+    async def receive(self):
+        return await self.incoming.get()
+
+
+class StreamTransport:
+    """ a connection over asyncio streams, where records are read one at a time using their header """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, record):
+        self.writer.write(record)
+        await self.writer.drain()
+
+    async def receive(self):
+        header = await self.reader.readexactly(HEADER_SIZE)
+        (kind, length) = read_header(header)
+        return header + await self.reader.readexactly(length)
+
+
+class Session:
+    """ the state of one run of the protocol """
+
+    def __init__(self, session_id, role):
+        self.id = session_id
+        self.role = role
+        self.state = STARTED
+        self.started = time.monotonic()
+        self.error = None
+
+
+class DelegationDriver:
+    def __init__(self, setup_path, t, l_message, processes=None, timeout=30.0, group=None):
+        """
+        Starts the worker processes of the driver.
+
+        :param setup_path: a file written by save_setup
+        :param t: max cardinality
+        :param l_message: the max number of the messages
+        :param processes: number of worker processes, the number of CPUs by default
+        :param timeout: seconds a session may take
+        :param group: bilinear group of the decoded points, a shared BpGroup by default
+        """
+        self.executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(setup_path, t, l_message))
+        self.timeout = timeout
+        self.group = group
+        self.sessions = {}
+        self._ids = itertools.count()
+
+    async def _run(self, role, steps):
+        """
+        runs the steps of a session with the timeout, keeping the session in self.sessions while it runs, and after
+        it if it failed (see collect_failed)
+        """
+        session = Session(next(self._ids), role)
+        self.sessions[session.id] = session
+        try:
+            ret = await asyncio.wait_for(steps(session), self.timeout)
+        except BaseException as e:
+            session.state = FAILED
+            session.error = e
+            raise
+        del self.sessions[session.id]
+        return ret
+
+    def collect_failed(self):
+        """ :return: the failed sessions (with their errors), which are removed from self.sessions """
+        failed = [session for session in self.sessions.values() if session.state == FAILED]
+        for session in failed:
+            del self.sessions[session.id]
+        return failed
+
+    async def _offload(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def delegate(self, transport, cred_u, A_l, l, sk_u):
+        """
+        Runs the delegator part of the protocol: delegates cred_u with an additional attributes set A_l.
+
+        :param transport: the connection to the delegatee
+        :param cred_u: delegator credential (sigma, update_key, commitment_vector, opening_vector)
+        :param A_l: additional attributes set added into the credential
+        :param l: index of the message set
+        :param sk_u: secret key of the credential holder
+        :return: the session
+        """
+        async def steps(session):
+            session.state = WAIT_NYM
+            nym_record = await transport.receive()
+            decode(nym_record, PROOF_NYM, self.group)
+            session.state = DELEGATING
+            try:
+                record = await self._offload(_delegator_step, encode(CRED, cred_u), A_l, l, int(sk_u), nym_record)
+            except ValueError as e:
+                await transport.send(encode(ABORT, str(e)))
+                raise
+            await transport.send(record)
+            session.state = DONE
+            return session
+        return await self._run("delegator", steps)
+
+    async def receive(self, transport, nym_R, sk_R, proof_nym_R):
+        """
+        Runs the delegatee part of the protocol.
+
+        :param transport: the connection to the delegator
+        :param nym_R: nym of the delegatee
+        :param sk_R: secret key of nym_R
+        :param proof_nym_R: proof of nym_R
+        :return: the credential (sigma_prime, commitment_vector, opening_vector, nym_P, chi) and the added attributes set
+        """
+        async def steps(session):
+            nym_record = encode(PROOF_NYM, (nym_R, proof_nym_R))
+            await transport.send(nym_record)
+            session.state = WAIT_CRED
+            record = await transport.receive()
+            (kind, obj) = decode(record, group=self.group)
+            if kind == ABORT:
+                raise ValueError("delegation aborted: %s" % obj)
+            if kind != DELEGATION:
+                raise ValueError("expected a delegation, got a record of kind %d" % kind)
+            session.state = CONVERTING
+            cred_record = await self._offload(_delegatee_step, record, int(sk_R), nym_record)
+            session.state = DONE
+            return decode(cred_record, CRED, self.group)[1], obj[1]
+        return await self._run("delegatee", steps)
+
+    def close(self):
+        """ stops the worker processes """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,176 @@
+"""
+Opt-in counting and timing of the expensive operations (pairings, scalar multiplications, hashing to G1,
+polynomials from roots, sums of points and multi-scalar multiplications) per high-level call of the schemes.
+Nothing is changed until enable() is called: it wraps the operations and the high-level methods, and
+disable() puts the originals back, so there is no overhead when it is disabled.
+
+    with instrumented() as counters:
+        dac.verify_proof(pp_dac, proof, D)
+    counters.snapshot()["DAC.verify_proof"]["ops"]["multi_pair"]["items"]
+"""
+
+import sys
+import importlib
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from bplib.bp import BpGroup, G1Elem, G2Elem
+
+## the scope that counts every operation, in or out of a high-level call
+TOTAL = "total"
+
+## (class, method, name of the operation)
+METHOD_OPS = [(BpGroup, "pair", "pair"), (BpGroup, "hashG1", "hashG1"), (G1Elem, "mul", "G1.mul"), (G2Elem, "mul", "G2.mul")]
+## (module, function) of core, wrapped in every core module that imported them
+FUNCTION_OPS = [("core.poly", "poly_from_roots"), ("core.util", "ec_sum"), ("core.util", "msm"),
+                ("core.util", "multi_pair"), ("core.util", "fixed_base_mul")]
+## (module, class, methods) counted as high-level calls
+SCOPES = [("core.dac", "DAC", ["issue_cred", "issue_cred_batch", "proof_cred", "verify_proof", "verify_proofs_batch", "delegator", "delegatee", "nym_gen"]),
+          ("core.spseq_uc", "EQC_Sign", ["sign", "sign_batch", "change_rep", "change_rel", "verify"]),
+          ("core.set_commit", "SetCommitment", ["commit_set", "commit_sets", "open_set", "open_subset", "open_subsets", "verify_subset"]),
+          ("core.set_commit", "CrossSetCommitment", ["aggregate_cross", "verify_cross"])]
+
+
+def _items(name, args):
+    """ the number of points (or pairs of points) an operation works on """
+    if name in ("msm", "ec_sum"):
+        return len(args[1] if name == "msm" else args[0])
+    if name == "multi_pair":
+        return len(args[1])
+    return 1
+
+
+class Counters:
+    """ counts and times of operations per scope, where a scope is a high-level call like DAC.verify_proof """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.scopes = {}
+
+    def reset(self):
+        with self.lock:
+            self.scopes = {}
+
+    def _active(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def _scope(self, name):
+        if name not in self.scopes:
+            self.scopes[name] = {"calls": 0, "seconds": 0.0, "ops": {}}
+        return self.scopes[name]
+
+    def add_op(self, op, items, seconds):
+        """ adds an operation to the total and to every active scope """
+        with self.lock:
+            for name in set(self._active() + [TOTAL]):
+                stats = self._scope(name)["ops"].setdefault(op, {"count": 0, "items": 0, "seconds": 0.0})
+                stats["count"] += 1
+                stats["items"] += items
+                stats["seconds"] += seconds
+
+    @contextmanager
+    def scope(self, name):
+        """ counts the operations in the block to the scope name (as well as to the enclosing scopes) """
+        stack = self._active()
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            with self.lock:
+                stats = self._scope(name)
+                stats["calls"] += 1
+                stats["seconds"] += seconds
+
+    def snapshot(self):
+        """
+        :return: a copy of the counters as {scope: {"calls", "seconds", "ops": {op: {"count", "items", "seconds"}}}}
+        """
+        with self.lock:
+            return {name: {"calls": stats["calls"], "seconds": stats["seconds"],
+                           "ops": {op: dict(op_stats) for op, op_stats in stats["ops"].items()}}
+                    for name, stats in self.scopes.items()}
+
+
+counters = Counters()
+## the originals of the wrapped attributes as (owner, name, original), empty when disabled
+_patched = []
+
+
+def _wrap_op(fn, name):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            counters.add_op(name, _items(name, args), time.perf_counter() - start)
+    return wrapper
+
+
+def _wrap_scope(fn, name):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with counters.scope(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _patch(owner, attr, wrapper):
+    _patched.append((owner, attr, getattr(owner, attr)))
+    setattr(owner, attr, wrapper)
+
+
+def is_enabled():
+    return len(_patched) > 0
+
+
+def enable():
+    """ wraps the operations and high-level calls to count them, does nothing if it is already enabled """
+    if is_enabled():
+        return
+    for (cls, method, name) in METHOD_OPS:
+        _patch(cls, method, _wrap_op(getattr(cls, method), name))
+    for (module_name, function) in FUNCTION_OPS:
+        original = getattr(importlib.import_module(module_name), function)
+        wrapper = _wrap_op(original, function)
+        for name, module in list(sys.modules.items()):
+            if (name == "core" or name.startswith("core.")) and getattr(module, function, None) is original:
+                _patch(module, function, wrapper)
+    for (module_name, class_name, methods) in SCOPES:
+        cls = getattr(importlib.import_module(module_name), class_name)
+        for method in methods:
+            if method in cls.__dict__:
+                _patch(cls, method, _wrap_scope(cls.__dict__[method], "%s.%s" % (class_name, method)))
+
+
+def disable():
+    """ puts back the original operations and high-level calls """
+    while _patched:
+        (owner, attr, original) = _patched.pop()
+        setattr(owner, attr, original)
+
+
+@contextmanager
+def instrumented(reset=True):
+    """
+    Counts the operations in a block.
+
+    :param reset: reset the counters before the block
+    :return: the counters, see Counters.snapshot
+    """
+    was_enabled = is_enabled()
+    if reset:
+        counters.reset()
+    enable()
+    try:
+        yield counters
+    finally:
+        if not was_enabled:
+            disable()
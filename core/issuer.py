@@ -0,0 +1,120 @@
+"""
+A pool-based issuer that runs DAC.issue_cred in parallel worker processes.
+Every worker loads the public parameters and the CA signing key once from a file written by
+storage.save_setup, and requests and credentials are passed between processes in the wire format.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from core.dac import DAC
+from core.storage import load_setup
+from core.wire import encode, decode, CRED, PROOF_NYM
+
+## state of a worker process, set by _init_worker
+_worker = None
+
+
+def _init_worker(setup_path, t, l_message):
+    global _worker
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = load_setup(setup_path)
+    if sk_ca is None:
+        raise ValueError("the setup file does not include the CA signing key")
+    dac = DAC(t=t, l_message=l_message)
+    _worker = (dac, pp_dac, sk_ca)
+
+
+def _issue(attr_vector, k_prime, nym_record):
+    """ issues one credential in a worker, and returns its record (None if the proof of nym is not valid) """
+    (dac, pp_dac, sk_ca) = _worker
+    start = time.perf_counter()
+    (kind, (nym_u, proof_nym_u)) = decode(nym_record, PROOF_NYM)
+    try:
+        cred = dac.issue_cred(pp_dac, attr_vector=attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=k_prime,
+                              proof_nym_u=proof_nym_u)
+        record = encode(CRED, cred)
+    except ValueError:
+        record = None
+    return (os.getpid(), time.perf_counter() - start, record)
+
+
+class Issuer:
+    def __init__(self, setup_path, t, l_message, processes=None, max_pending=None):
+        """
+        Starts the worker processes of the issuer.
+
+        :param setup_path: a file written by save_setup with include_secret_key=True
+        :param t: max cardinality
+        :param l_message: the max number of the messages
+        :param processes: number of worker processes, the number of CPUs by default
+        :param max_pending: max number of requests submitted to the workers at a time, twice the processes by default
+        """
+        self.processes = processes or os.cpu_count()
+        self.max_pending = max_pending or 2 * self.processes
+        self.executor = ProcessPoolExecutor(self.processes, initializer=_init_worker,
+                                            initargs=(setup_path, t, l_message))
+        self.worker_stats = {}
+
+    def issue(self, requests, ordered=True, group=None):
+        """
+        Issues credentials for a stream of requests. Requests are read from the stream only when fewer than
+        max_pending are in the workers, so a large (or endless) stream does not fill up the memory.
+
+        :param requests: an iterable of (attr_vector, nym_u, proof_nym_u) or (attr_vector, nym_u, proof_nym_u, k_prime)
+        :param ordered: yield the credentials in the order of the requests, otherwise as they are done
+        :param group: bilinear group of the decoded credentials, a shared BpGroup by default
+        :return: a generator of (index of the request, credential), the credential is None if the proof of nym is not valid
+        """
+        pending = deque() if ordered else set()
+        requests = iter(enumerate(requests))
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.max_pending:
+                try:
+                    (index, request) = next(requests)
+                except StopIteration:
+                    exhausted = True
+                    break
+                (attr_vector, nym_u, proof_nym_u) = request[:3]
+                k_prime = request[3] if len(request) > 3 else None
+                future = self.executor.submit(_issue, attr_vector, k_prime, encode(PROOF_NYM, (nym_u, proof_nym_u)))
+                future.index = index
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+            if len(pending) == 0:
+                return
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                (done, not_done) = wait(pending, return_when=FIRST_COMPLETED)
+                pending -= done
+            for future in done:
+                (pid, seconds, record) = future.result()
+                self._record_stats(pid, seconds)
+                yield future.index, (decode(record, CRED, group)[1] if record is not None else None)
+
+    def _record_stats(self, pid, seconds):
+        stats = self.worker_stats.setdefault(pid, {"requests": 0, "seconds": 0.0, "max_seconds": 0.0})
+        stats["requests"] += 1
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def stats(self):
+        """
+        :return: per worker process id, the number of requests it issued, and the total, mean and max seconds spent on them
+        """
+        return {pid: dict(stats, mean_seconds=stats["seconds"] / stats["requests"])
+                for pid, stats in self.worker_stats.items()}
+
+    def close(self):
+        """ stops the worker processes """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,125 @@
+"""
+A streaming pipeline to verify proofs of credentials that arrive as encoded records (see wire.py), e.g. from a
+message queue. Each proof is decoded and checked for its shape, then the proofs of nym of a batch are checked
+together with one MSM (see ZKP_Schnorr.verify_batch), and the proofs that pass are verified in batches of
+pairing checks (see DAC.check_equations_batch).
+At most one batch of proofs is held at a time, so the memory use does not depend on the length of the stream.
+"""
+
+from bplib.bp import G1Elem, G2Elem
+from petlib.bn import Bn
+from core.wire import decode, PROOF
+
+
+def _is_G1(obj):
+    return isinstance(obj, G1Elem)
+
+
+def well_formed(proof, D, max_commitments=None):
+    """
+    Checks that a decoded proof has the shape of a proof of credential for D, so that a malformed proof is
+    rejected before any group operation.
+
+    :param proof: a decoded proof
+    :param D: subset attributes
+    :param max_commitments: the max number of commitments of a credential, i.e., len(vk) - 3, not checked if none
+    :return: 0/1
+    """
+    if not (isinstance(proof, tuple) and len(proof) == 5):
+        return False
+    (sigma_prime, rndmz_commitment_vector, nym_P, Witness_pi, proof_nym_p) = proof
+    if not (isinstance(sigma_prime, tuple) and len(sigma_prime) == 4 and isinstance(sigma_prime[2], G2Elem) and
+            all(_is_G1(sigma_prime[i]) for i in (0, 1, 3))):
+        return False
+    if not (isinstance(rndmz_commitment_vector, list) and len(rndmz_commitment_vector) >= len(D) and
+            (max_commitments is None or len(rndmz_commitment_vector) <= max_commitments) and
+            all(_is_G1(C) for C in rndmz_commitment_vector)):
+        return False
+    if not (_is_G1(nym_P) and _is_G1(Witness_pi) and isinstance(proof_nym_p, tuple) and len(proof_nym_p) == 5):
+        return False
+    (challenge, pedersen_open, pedersen_commit, nym, response) = proof_nym_p
+    return isinstance(challenge, Bn) and isinstance(response, Bn) and _is_G1(pedersen_commit) and _is_G1(nym) and \
+        isinstance(pedersen_open, tuple) and len(pedersen_open) == 3 and isinstance(pedersen_open[0], Bn) and \
+        isinstance(pedersen_open[1], Bn) and _is_G1(pedersen_open[2])
+
+
+def _batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
+
+
+def verify_stream(dac, pp_dac, items, D=None, batch_size=32, group=None):
+    """
+    Verifies a stream of encoded proofs of credentials.
+
+    :param dac: a DAC object
+    :param pp_dac: public parameters
+    :param items: an iterable of (id, record) or (id, record, D), where record is a PROOF record (bytes or memoryview)
+    :param D: subset attributes of the proofs that do not give their own, a proof without any is rejected
+    :param batch_size: number of proofs whose pairing equations are checked together
+    :param group: bilinear group of the decoded points, a shared BpGroup by default
+    :return: a generator of (id, 0/1) in the order of the items
+    """
+    if D is not None and not valid_subsets(D, _limits(pp_dac)[0]):
+        raise ValueError("D is not a list of subsets of at most t - 1 attributes")
+    return _verify_batches(dac, pp_dac, items, D, batch_size, group)
+
+
+def valid_subsets(D, max_attributes=None):
+    """
+    Checks that D is a list of subsets of attributes (strings).
+
+    :param D: subset attributes
+    :param max_attributes: the max number of attributes of all subsets together, i.e., t - 1 for max cardinality t,
+        not checked if none
+    :return: 0/1
+    """
+    return isinstance(D, (list, tuple)) and \
+        all(isinstance(subset, (list, tuple)) and all(isinstance(a, str) for a in subset) for subset in D) and \
+        (max_attributes is None or sum(len(subset) for subset in D) <= max_attributes)
+
+
+def _limits(pp_dac):
+    """ the max number of attributes of D and of commitments of a proof that the parameters can verify """
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+    (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
+    return len(pp_commit_G2) - 1, len(vk_ca) - 3
+
+
+def _verify_batches(dac, pp_dac, items, D, batch_size, group):
+    limits = _limits(pp_dac)
+    for batch in _batches(items, batch_size):
+        ids = []
+        proofs = []
+        for item in batch:
+            (item_id, record) = item[:2]
+            item_D = item[2] if len(item) > 2 else D
+            ids.append(item_id)
+            proofs.append((_decode_proof(record, item_D, group, limits), item_D))
+        # the proofs of nym of the well-formed proofs are checked together before any pairing
+        decoded = [i for i in range(len(proofs)) if proofs[i][0] is not None]
+        nym_verdicts = dac.zkp.verify_batch([proofs[i][0][4] for i in decoded], pp_dac[1])
+        equations = [None] * len(proofs)
+        for i, nym_valid in zip(decoded, nym_verdicts):
+            if nym_valid:
+                equations[i] = dac.proof_equations(pp_dac, proofs[i][0], proofs[i][1], check_nym=False)
+        yield from zip(ids, dac.check_equations_batch(pp_dac, equations))
+
+
+def _decode_proof(record, D, group, limits):
+    """ decodes a proof, or gives None if it is malformed or D is not valid, both within limits (see _limits) """
+    (max_attributes, max_commitments) = limits
+    if not valid_subsets(D, max_attributes):
+        return None
+    try:
+        (kind, proof) = decode(record, PROOF, group)
+    except Exception:
+        # besides malformed records, bplib raises a plain Exception for bytes that are not a point
+        return None
+    return proof if well_formed(proof, D, max_commitments) else None
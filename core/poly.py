@@ -0,0 +1,118 @@
+"""
+Polynomial arithmetic over Z_p used by set commitments, where p is the order of the bilinear groups.
+A polynomial is a list of coefficients in ascending order (as numpy.polynomial), kept as Python integers
+reduced modulo p at every step, so that coefficients never grow with the size of the set.
+"""
+
+
+def poly_reduce(coeff, order):
+    """ reduces the coefficients (Bn or int) modulo order """
+    o = int(order)
+    return [int(c) % o for c in coeff]
+
+
+def poly_mul(coeff_a, coeff_b, order):
+    """ multiplies two polynomials """
+    o = int(order)
+    ret = [0] * (len(coeff_a) + len(coeff_b) - 1)
+    for i, a in enumerate(coeff_a):
+        if a == 0:
+            continue
+        for j, b in enumerate(coeff_b):
+            ret[i + j] += a * b
+    return [c % o for c in ret]
+
+
+def poly_scale(coeff, scalar, order):
+    """ multiplies a polynomial by a scalar (Bn or int) """
+    o = int(order)
+    s = int(scalar) % o
+    return [(c * s) % o for c in coeff]
+
+
+def subproduct_tree(roots, order):
+    """
+    Builds the subproduct tree of a list of roots: level 0 holds the polynomials (x - r) of each root and every
+    next level holds the products of pairs of the previous one, so the last level is [prod (x - r)].
+
+    :param roots: a list of roots (Bn or int)
+    :param order: order of the field
+    :return: a list of levels, each a list of polynomials
+    """
+    o = int(order)
+    level = [[(-int(r)) % o, 1] for r in roots]
+    tree = [level]
+    while len(level) > 1:
+        level = [poly_mul(level[i], level[i + 1], o) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        tree.append(level)
+    return tree
+
+
+def subproduct_cofactors(tree, order):
+    """
+    Computes prod_{j != i} (x - r_j) for every root r_i of a subproduct tree, going down the tree: the cofactor of
+    a node is the cofactor of its parent times its sibling, so the products of the inner nodes are shared by all
+    roots instead of dividing the whole product by each (x - r_i).
+
+    :param tree: a subproduct tree (see subproduct_tree)
+    :param order: order of the field
+    :return: a list of polynomials, one for each root
+    """
+    o = int(order)
+    if len(tree[0]) == 0:
+        return []
+    cofactors = [[1]]
+    for level in reversed(tree[:-1]):
+        cofactors = [poly_mul(cofactors[j // 2], level[j ^ 1], o) if (j ^ 1) < len(level) else cofactors[j // 2]
+                     for j in range(len(level))]
+    return cofactors
+
+
+def poly_from_roots(roots, order):
+    """
+    Computes the coefficients of prod (x - r) for a list of roots using a product tree.
+
+    :param roots: a list of roots (Bn or int)
+    :param order: order of the field
+    :return: the coefficients in ascending order, [1] for no roots
+    """
+    if len(roots) == 0:
+        return [1]
+    return subproduct_tree(roots, order)[-1][0]
+
+
+def poly_divmod(coeff_a, coeff_b, order):
+    """
+    Divides polynomial a by polynomial b.
+
+    :return: a quotient and a remainder
+    """
+    o = int(order)
+    (rem, divisor) = (poly_reduce(coeff_a, o), poly_reduce(coeff_b, o))
+    while len(divisor) > 1 and divisor[-1] == 0:
+        divisor.pop()
+    if divisor[-1] == 0:
+        raise ZeroDivisionError("polynomial division by zero")
+    lead_inverse = pow(divisor[-1], -1, o)
+    quotient = [0] * max(len(rem) - len(divisor) + 1, 1)
+    for i in reversed(range(len(rem) - len(divisor) + 1)):
+        q = (rem[i + len(divisor) - 1] * lead_inverse) % o
+        quotient[i] = q
+        if q != 0:
+            for j, d in enumerate(divisor):
+                rem[i + j] = (rem[i + j] - q * d) % o
+    rem = rem[:len(divisor) - 1] or [0]
+    while len(rem) > 1 and rem[-1] == 0:
+        rem.pop()
+    return (quotient, rem)
+
+
+def poly_eval(coeff, x, order):
+    """ evaluates a polynomial at x using Horner's rule """
+    o = int(order)
+    x = int(x) % o
+    ret = 0
+    for c in reversed(coeff):
+        ret = (ret * x + int(c)) % o
+    return ret
@@ -0,0 +1,103 @@
+"""
+An offline/online split of DAC.proof_cred. The randomness of a proof of credential does not depend on the
+credential: mu, psi, mu / psi, chi, chi * g_1, chi * vk[0] and the Damgard announcement w * g with its Pedersen
+commitment (and its challenge) can be computed ahead of time, e.g. while a wallet is idle. RandomizerPool keeps a
+bounded pool of them, filled by a background thread, and proof_cred(..., pool=pool) takes one per proof, so only
+the multiplications that depend on the credential are left on the online path.
+
+    with RandomizerPool(dac, pp_dac, size=16) as pool:
+        proof = dac.proof_cred(pp_dac, nym_R, aux_R, cred_R, Attr, D, pool=pool)
+
+Every entry is used once, since reusing the randomness of a proof would link proofs (and leak the secret key of
+the nym through the responses).
+"""
+
+import queue
+import threading
+from core.util import fixed_base_mul, pedersen_committ
+
+
+class RandomizerPool:
+    def __init__(self, dac, pp_dac, size=32, background=True):
+        """
+        Creates a pool for the proofs of credentials of one issuer.
+
+        :param dac: a DAC object, its zkp gives the challenges
+        :param pp_dac: public parameters, the entries are only valid for its vk_ca and Pedersen parameters
+        :param size: max number of entries kept in the pool
+        :param background: fill the pool with a background thread, otherwise only fill() and take() compute entries
+        """
+        self.dac = dac
+        self.pp_dac = pp_dac
+        self.entries = queue.Queue(maxsize=size)
+        self.misses = 0
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="randomizer-pool", daemon=True)
+            self._thread.start()
+
+    def compute(self):
+        """
+        Computes one entry.
+
+        :return: (mu, psi, offline, announcement), where offline is the input of EQC_Sign.change_rep and
+            announcement is (pedersen_commit, pedersen_open, challenge) of the proof of nym
+        """
+        (pp_sign, pp_zkp, pp_nizkp, vk_ca) = self.pp_dac
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
+        (G, g, o, h) = pp_zkp
+        mu, psi, chi = order.random(), order.random(), order.random()
+        offline = (mu.mod_mul(psi.mod_inverse(order), order), chi, fixed_base_mul(pp_commit_G1, 0, chi), chi * vk_ca[0])
+
+        # the announcement of the proof of nym as in Damgard_Transfor.announce, and its challenge
+        w_random = o.random()
+        (pedersen_commit, (r, m)) = pedersen_committ(pp_zkp, w_random)
+        pedersen_open = (r, m, w_random * g)
+        challenge = self.dac.zkp.challenge(['schnorr', g, h, pedersen_commit])
+        return (mu, psi, offline, (pedersen_commit, pedersen_open, challenge))
+
+    def _run(self):
+        while not self._stop.is_set():
+            entry = self.compute()
+            while not self._stop.is_set():
+                try:
+                    self.entries.put(entry, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def fill(self, count=None):
+        """
+        Adds entries in the calling thread, e.g. before the first proofs when there is no background thread.
+
+        :param count: number of entries to add, up to the size of the pool by default
+        """
+        added = 0
+        while not self.entries.full() and (count is None or added < count):
+            self.entries.put(self.compute())
+            added += 1
+
+    def take(self):
+        """ :return: an entry (see compute), computed now if the pool is empty """
+        try:
+            return self.entries.get_nowait()
+        except queue.Empty:
+            self.misses += 1
+            return self.compute()
+
+    def __len__(self):
+        return self.entries.qsize()
+
+    def close(self):
+        """ stops the background thread, the entries left can still be taken """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
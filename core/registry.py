@@ -0,0 +1,83 @@
+"""
+A registry of the credential schemas (DAC objects with their max cardinality t, number of messages and setup) of
+one process, e.g. a worker that issues or verifies credentials of many schemas instead of a process per schema.
+All schemas use the shared bilinear group, and a setup file is loaded once however many schemas use it, so they
+share its points and memory-mapped tables (a schema may use a setup of a larger t).
+
+    registry = Registry()
+    registry.add("id-card", t=5, l_message=6, setup="pp_dac.bin")
+    registry.add("ticket", t=3, l_message=4, setup="pp_dac.bin")
+    (dac, setup) = registry.get("ticket")
+"""
+
+from threading import Lock
+from core.context import shared_group
+from core.dac import DAC
+from core.storage import load_setup
+
+
+class Registry:
+    def __init__(self, group=None):
+        """
+        :param group: bilinear group of all schemas, the shared group by default
+        """
+        self.group = group if group is not None else shared_group()
+        self.schemas = {}
+        self.setups = {}
+        self.lock = Lock()
+
+    def load(self, path):
+        """ :return: the setup saved in a file (see storage.save_setup), loaded once per path """
+        with self.lock:
+            if path not in self.setups:
+                self.setups[path] = load_setup(path, self.group)
+            return self.setups[path]
+
+    def add(self, name, t, l_message, setup=None, table_budget=None):
+        """
+        Adds a schema.
+
+        :param name: name of the schema
+        :param t: max cardinality
+        :param l_message: the max number of the messages
+        :param setup: the output of DAC.setup, or the path of a file written by save_setup, a new setup by default
+        :param table_budget: bytes for the fixed-base tables of a new setup
+        :return: the DAC object of the schema and its setup
+        """
+        dac = DAC(t=t, l_message=l_message, table_budget=table_budget, group=self.group)
+        if setup is None:
+            setup = dac.setup()
+        elif isinstance(setup, str):
+            setup = self.load(setup)
+        (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = setup
+        (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+        if t > len(pp_sign[1]):
+            raise ValueError("the setup is for max cardinality %d, not %d" % (len(pp_sign[1]), t))
+        if l_message > len(vk_ca) - 1:
+            raise ValueError("the setup is for %d messages, not %d" % (len(vk_ca) - 1, l_message))
+        with self.lock:
+            if name in self.schemas:
+                raise ValueError("schema %s already exists" % name)
+            self.schemas[name] = (dac, setup)
+        return dac, setup
+
+    def get(self, name):
+        """ :return: the DAC object and the setup of a schema """
+        with self.lock:
+            return self.schemas[name]
+
+    def remove(self, name):
+        with self.lock:
+            del self.schemas[name]
+
+    def names(self):
+        with self.lock:
+            return list(self.schemas)
+
+    def __contains__(self, name):
+        with self.lock:
+            return name in self.schemas
+
+    def __len__(self):
+        with self.lock:
+            return len(self.schemas)
@@ -6,38 +6,69 @@ See  the following for the details:
 - (PETS) Practical, Efficient, Delegatable Ano nymous Credentials through SPSEQ-UC, by Mir et al.,
 @Author: Omid Mir
 """
-from bplib.bp import BpGroup
-from binascii import hexlify
+from collections import OrderedDict
+from threading import Lock
 from hashlib import sha256
-from numpy.polynomial.polynomial import polyfromroots
 from petlib.bn import Bn
-from core.util import convert_mess_to_bn, ec_sum, product_GT, eq_dh_relation
+from core.util import convert_mess_to_bn, msm, pairing_check, eq_dh_relation, FixedBases, generator_mul, make_affine
+from core.poly import poly_from_roots, poly_scale, poly_divmod, subproduct_tree, subproduct_cofactors
+from core.zp import ZpVector
+from core.transcript import Transcript
+from core.context import Context
+
+
+def witness_polynomial(mess_set_str, subset_str, order):
+    """
+    Computes the witness polynomial of a subset, i.e., prod (x - m) for the messages m of the set that are not in
+    the subset. It only takes strings and integers, so it can also run in a process pool.
+
+    :param mess_set_str: the message set
+    :param subset_str: a subset of the message set
+    :param order: order of the groups
+
+    :return: the coefficients in ascending order, or None if subset_str is not a subset of mess_set_str
+    """
+    # convert the string to BN elements
+    mess_set = convert_mess_to_bn(mess_set_str)
+    mess_subset_t = convert_mess_to_bn(subset_str)
+
+    # check if mess_subset is a subset of mess_set
+    if len(mess_subset_t) > len(mess_set) or not all(item in mess_set for item in mess_subset_t):
+        return None
+    return poly_from_roots([item for item in mess_set if item not in mess_subset_t], order)
 
 
 class SetCommitment:
-    def __init__(self, max_cardinal = 1):
+    def __init__(self, max_cardinal = 1, context=None):
         """
         Initializes a SetCommitment object.
 
-        :param BG: bilinear pairing groups
         :param max_cardinal: the maximum cardinality t (default value is 1)
+        :param context: the parameters of the scheme (see context.py), a Context of max_cardinal by default
         """
-        global group, max_cardinality
-        max_cardinality = max_cardinal
-        group = BG = BpGroup()
+        self.context = context if context is not None else Context(max_cardinal)
 
-    @staticmethod
-    def setup():
+    def setup(self, table_budget=None):
         """
-        A static method to generate public parameters.
+        Generates public parameters.
 
+        :param table_budget: bytes that fixed-base tables of P^ai and P_hat^ai may use (half each), none by default
         :return: a tuple containing the public parameters and alpha_trapdoor
         """
+        group = self.context.group
         g_1, g_2 = group.gen1(), group.gen2()
         order = group.order()
         alpha_trapdoor = order.random()
-        pp_commit_G1 = [g_1.mul(alpha_trapdoor.pow(i)) for i in range(max_cardinality)]
-        pp_commit_G2 = [g_2.mul(alpha_trapdoor.pow(i)) for i in range(max_cardinality)]
+        # compute the powers of alpha one from another and multiply the generators with their precomputation
+        alpha_powers = [Bn(1)]
+        for i in range(1, self.context.max_cardinality):
+            alpha_powers.append(alpha_powers[-1].mod_mul(alpha_trapdoor, order))
+        pp_commit_G1 = FixedBases(generator_mul(group, alpha_powers))
+        pp_commit_G2 = FixedBases(generator_mul(group, alpha_powers, in_G2=True))
+        # precompute tables once, they are shared by every scheme using param_sc
+        if table_budget:
+            pp_commit_G1.precompute(table_budget // 2)
+            pp_commit_G2.precompute(table_budget // 2)
         param_sc = (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group)
         return param_sc, alpha_trapdoor
 
@@ -54,19 +85,36 @@ class SetCommitment:
 
         # convert string to Zp
         mess_set = convert_mess_to_bn(mess_set_str)
-        monypol_coeff = polyfromroots(mess_set)
+        monypol_coeff = poly_from_roots(mess_set, order)
         rho = group.order().random()
 
-        # create group elements using the coefficent and public info
-        coef_points = [(pp_commit_G1.__getitem__(i)).mul(monypol_coeff[i])for i in range(len(monypol_coeff))]
-
-        # create a set commitment and opening info
-        pre_commit = ec_sum(coef_points)
-        commitment = pre_commit.mul(rho)
+        # create a set commitment as a multi-scalar multiplication of the public info with the (rho times) coefficients
+        commitment = msm(pp_commit_G1, poly_scale(monypol_coeff, rho, order))
         open_info = rho
         return (commitment, open_info)
 
 
+    def commit_sets(self, param_sc, mess_sets_str):
+        """
+        Commits to many sets, e.g. the message sets of many credentials with the same attributes. The polynomial of
+        a set that occurs more than once is computed only once.
+
+        :param param_sc: public parameters
+        :param mess_sets_str: a list of message sets
+
+        :return: a list of (commitment, opening information), one for each set
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+        polynomials = {}
+        ret = []
+        for mess_set_str in mess_sets_str:
+            key = tuple(mess_set_str)
+            if key not in polynomials:
+                polynomials[key] = poly_from_roots(convert_mess_to_bn(mess_set_str), order)
+            rho = order.random()
+            ret.append((msm(pp_commit_G1, poly_scale(polynomials[key], rho, order)), rho))
+        return ret
+
     def open_set(self, param_sc, commitment, open_info, mess_set_str):
         """
         Verifies the opening information of a set.
@@ -80,12 +128,10 @@ class SetCommitment:
         (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
 
         mess_set = convert_mess_to_bn(mess_set_str)
-        monypol_coeff = polyfromroots(mess_set)
+        monypol_coeff = poly_from_roots(mess_set, order)
 
-        #pre compitation to recompute the commitment
-        coef_points = [(pp_commit_G1.__getitem__(i)).mul(monypol_coeff[i])for i in range(len(monypol_coeff))]
-        pre_commit = ec_sum(coef_points)
-        re_commit = pre_commit.mul(open_info)
+        #recompute the commitment
+        re_commit = msm(pp_commit_G1, poly_scale(monypol_coeff, open_info, order))
 
         #check if the regenerated commitment is match with the orginal commitment
         return re_commit == commitment
@@ -103,35 +149,51 @@ class SetCommitment:
         """
         (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
 
-        # convert the string to BN elements
-        mess_set = convert_mess_to_bn(mess_set_str)
-        mess_subset_t = convert_mess_to_bn(subset_str)
-
-        #Checks if mess_subset is a subset of mess_set
-        def is_subset(mess_set, mess_subset_t):
-            chcker = None
-            if len(mess_subset_t) > len(mess_set):
-                return False
-            else:
-                for item in mess_subset_t:
-                    if (item in mess_set):
-                        chcker = True
-                    else:
-                        chcker = False
-            return chcker
-
         # compute a witness for subset mess_subset_t
-        if is_subset(mess_set, mess_subset_t) == True:
-            create_witn_elements = [item for item in mess_set if item not in mess_subset_t]
-            coeff_witn = polyfromroots(create_witn_elements)
-            witn_groups = [(pp_commit_G1.__getitem__(i)).mul(coeff_witn[i]) for i in range(len(coeff_witn))]
-            witn_sum = ec_sum(witn_groups)
-            witness = witn_sum.mul(open_info)
+        coeff_witn = witness_polynomial(mess_set_str, subset_str, order)
+        if coeff_witn is not None:
+            witness = msm(pp_commit_G1, poly_scale(coeff_witn, open_info, order))
             return witness
         else:
             print("It is Not a subset")
             return False
 
+    def open_subsets(self, param_sc, mess_set_str, open_info, subsets_str=None):
+        """
+        Generates witnesses for many subsets of the same message set. For the singletons (the default), the
+        witness polynomials prod_{j != i} (x - m_j) are the cofactors of a subproduct tree of the set, which share
+        the products of its inner nodes. For other subsets, the polynomial of the set is computed once and each
+        witness costs one polynomial division and one MSM.
+
+        :param param_sc: public parameters
+        :param mess_set_str: the message set
+        :param open_info: opening information
+        :param subsets_str: a list of subsets of the message set, all singletons by default
+
+        :return: a list of witnesses, with False for an entry which is not a subset
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+
+        mess_set = convert_mess_to_bn(mess_set_str)
+        if subsets_str is None:
+            # an empty set has no singletons, and subproduct_cofactors gives no polynomials for it
+            cofactors = subproduct_cofactors(subproduct_tree(mess_set, order), order)
+            return [msm(pp_commit_G1, poly_scale(coeff_witn, open_info, order)) for coeff_witn in cofactors]
+
+        # the polynomial of an empty set is 1, so only the empty subset has a witness
+        coeff_set = poly_from_roots(mess_set, order)
+        witnesses = []
+        for subset_str in subsets_str:
+            mess_subset_t = convert_mess_to_bn(subset_str)
+            # the witness polynomial is the quotient of the set polynomial by the subset polynomial
+            coeff_witn, remainder = poly_divmod(coeff_set, poly_from_roots(mess_subset_t, order), order)
+            if remainder != [0] or not all(item in mess_set for item in mess_subset_t):
+                print("It is Not a subset")
+                witnesses.append(False)
+            else:
+                witnesses.append(msm(pp_commit_G1, poly_scale(coeff_witn, open_info, order)))
+        return witnesses
+
     def verify_subset(self, param_sc, commitment, subset_str, witness):
         """
         Verifies if witness proves that subset_str is a subset of the original message set.
@@ -147,18 +209,74 @@ class SetCommitment:
         # convert messagse to BN type
         mess_subset_t = convert_mess_to_bn(subset_str)
         # compute a polynomial for message set
-        coeff_t = polyfromroots(mess_subset_t)
-        subset_group_elements =[(pp_commit_G2.__getitem__(i)).mul(coeff_t[i])for i in range(len(coeff_t))]
-        subset_elements_sum = ec_sum(subset_group_elements)
+        coeff_t = poly_from_roots(mess_subset_t, order)
+        subset_elements_sum = msm(pp_commit_G2, coeff_t)
 
-        return group.pair(witness, subset_elements_sum) == group.pair(commitment, g_2)
+        # check e(witness, P_T) * e(-commitment, g_2) = 1 with a single final exponentiation
+        return pairing_check(group, [(witness, subset_elements_sum), (commitment.neg(), g_2)])
 
  
 """ Here is CrossSetCommitment that extends the Set Commitment to provide aggregation witness and a batch verification """
- 
+
+## the max number of prepared policies a CrossSetCommitment object keeps
+MAX_PREPARED_POLICIES = 128
+## the max number of cross challenges (one per commitment) a CrossSetCommitment object keeps
+MAX_CROSS_CHALLENGES = 1024
+## the max number of public parameters whose fingerprint a CrossSetCommitment object keeps
+MAX_PARAM_FINGERPRINTS = 16
+
 class CrossSetCommitment(SetCommitment):
-    def __init__(self, max_cardinal):
-        SetCommitment.__init__(self, max_cardinal)
+    def __init__(self, max_cardinal, context=None):
+        SetCommitment.__init__(self, max_cardinal, context)
+        self.prepared_policies = OrderedDict()
+        self.param_fingerprints = OrderedDict()
+        self.prepared_policies_lock = Lock()
+        self.cross_challenges = OrderedDict()
+        self.cross_challenges_lock = Lock()
+
+    @staticmethod
+    def union(subsets_vector):
+        """ create a union of sets """
+        set_s = subsets_vector[0]
+        for i in range(1, len(subsets_vector)):
+            set_s = set_s + subsets_vector[i]
+        return set_s
+
+    @staticmethod
+    def not_intersection(list_S, list_T):
+        """ create a set that is not intersection of two other sets """
+        set_s_not_t = [value for value in list_S if value not in list_T]
+        return set_s_not_t
+
+    @staticmethod
+    def cross_challenge(commitment):
+        """ generates a Bn challenge t_i by hashing a commitment """
+        return Transcript(b"cross_challenge").absorb(commitment).challenge()
+
+    def challenges(self, commit_vector):
+        """
+        Gives the cross challenges of commitments, cached by the encoding of the commitment for the most recently
+        used ones, so that e.g. aggregating and verifying a proof of the same commitments (also decoded from the
+        wire) hash each commitment once. The cache can be used from several threads.
+
+        :param commit_vector: the commitment vector
+        :return: a list of the challenges t_i
+        """
+        ret = []
+        for commitment in commit_vector:
+            key = commitment.export()
+            with self.cross_challenges_lock:
+                challenge = self.cross_challenges.get(key)
+                if challenge is not None:
+                    self.cross_challenges.move_to_end(key)
+            if challenge is None:
+                challenge = self.cross_challenge(commitment)
+                with self.cross_challenges_lock:
+                    self.cross_challenges[key] = challenge
+                    if len(self.cross_challenges) > MAX_CROSS_CHALLENGES:
+                        self.cross_challenges.popitem(last=False)
+            ret.append(challenge)
+        return ret
 
     def aggregate_cross(self, witness_vector, commit_vector):
         """
@@ -170,18 +288,51 @@ class CrossSetCommitment(SetCommitment):
         :return: a proof which is a aggregate of witnesses and shows all subsets are valid for respective sets
         """
 
-        witnessness_group_elements = list()
-        for i in range(len(witness_vector)):
-            """ generates a Bn challenge t_i by hashing a number of EC points """
-            Cstring = b",".join([hexlify(commit_vector[i].export())])
-            chash = sha256(Cstring).digest()
-            hash_i = Bn.from_binary(chash)
-            witnessness_group_elements.append(witness_vector[i].mul(hash_i))
-            # pi = (list_W[i+1] ** t_i).add(pi)
-            # comute pi as each element of list power to t_i
-        proof = ec_sum(witnessness_group_elements)
+        # comute pi as the sum of each witness to the power of its challenge t_i
+        hashes = self.challenges(commit_vector[:len(witness_vector)])
+        proof = msm(witness_vector, hashes)
         return proof
 
+    def aggregate_polynomials(self, param_sc, witness_coeffs, openings, commit_vector):
+        """
+        Computes the aggregate proof of aggregate_cross directly from the witness polynomials, without computing
+        each witness. Since all witnesses use the same bases, sum_i t_i * W_i is a single MSM of size at most t
+        with the combined coefficients sum_i t_i * rho_i * coeff_i.
+
+        :param param_sc: public parameters
+        :param witness_coeffs: a list of witness polynomials (see witness_polynomial)
+        :param openings: the opening information rho_i of each commitment
+        :param commit_vector: the commitment vector
+
+        :return: a proof which is a aggregate of witnesses and shows all subsets are valid for respective sets
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+        hashes = self.challenges(commit_vector[:len(witness_coeffs)])
+        factors = ZpVector(openings[:len(witness_coeffs)], order).mul(hashes)
+        return msm(pp_commit_G1, ZpVector.combine(witness_coeffs, factors, order))
+
+    def open_and_aggregate(self, param_sc, sets, openings, subsets, commit_vector=None):
+        """
+        Computes the aggregate proof of valid subsets of sets of messages in one MSM, i.e., the same proof as
+        open_subset for each set followed by aggregate_cross.
+
+        :param param_sc: public parameters
+        :param sets: the message sets
+        :param openings: the opening information of the commitment of each set
+        :param subsets: a subset of each message set
+        :param commit_vector: the commitments of the sets, recomputed from the sets and openings if not given
+
+        :return: a proof which is a aggregate of witnesses and shows all subsets are valid for respective sets
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+        witness_coeffs = [witness_polynomial(sets[i], subsets[i], order) for i in range(len(sets))]
+        if None in witness_coeffs:
+            raise ValueError("It is Not a subset")
+        if commit_vector is None:
+            commit_vector = [msm(pp_commit_G1, poly_scale(poly_from_roots(convert_mess_to_bn(sets[i]), order), openings[i], order))
+                             for i in range(len(sets))]
+        return self.aggregate_polynomials(param_sc, witness_coeffs, openings, commit_vector)
+
     def verify_cross(self, param_sc, commit_vector, subsets_vector_str, proof):
         """
         Verifies an aggregate proof of valid subsets of a set of messages.
@@ -194,45 +345,103 @@ class CrossSetCommitment(SetCommitment):
         :return: 1 or 0
         """
         (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+        return pairing_check(group, self.verify_cross_equation(param_sc, commit_vector, subsets_vector_str, proof))
 
-        # create a union of sets
-        def union(subsets_vector):
-            set_s = subsets_vector[0]
-            for i in range(1, len(subsets_vector)):
-                set_s = set_s + subsets_vector[i]
-            return set_s
-
-        # create a set that is not intersection of two other sets
-        def not_intersection(list_S, list_T):
-            set_s_not_t = [value for value in list_S if value not in list_T]
-            return set_s_not_t
+    def verify_cross_equation(self, param_sc, commit_vector, subsets_vector_str, proof):
+        """
+        Gives the pairing product equation checked by verify_cross, i.e.,
+        e(proof, P_S) * prod_j e(-t_j * C_j, P_{S not T_j}) = 1, so that it can be batched with other equations.
 
-        # convert message str into the BN
-        subsets_vector = [convert_mess_to_bn(item) for item in subsets_vector_str]
-        set_s = union(subsets_vector)
-        coeff_set_s = polyfromroots(set_s)
+        :param param_sc: public parameters
+        :param commit_vector: the set commitment vector
+        :param subsets_vector_str: the message sets vector
+        :param proof: a proof which is a aggregate of witnesses
 
-        # compute right side of veriication
-        set_s_group_elements = [(pp_commit_G2.__getitem__(i)).mul(coeff_set_s[i])for i in range(len(coeff_set_s))]
-        set_s_elements_sum = ec_sum(set_s_group_elements)
-        right_side = group.pair(proof, set_s_elements_sum)
-        set_s_not_t = [not_intersection(set_s, subsets_vector[i]) for i in range(len(subsets_vector))]
+        :return: a list of (G1, G2) pairs whose pairing product is one if the proof is valid
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+        (set_s_elements_sum, not_t_elements_sums) = self.prepared_policy(param_sc, subsets_vector_str)
+        equation = [(proof, set_s_elements_sum)]
 
-        # compute left side of veriication
-        vector_GT = list()
+        # move the challenge t_j to the G1 side, which is cheaper than multiplying in G2
+        hashes = self.challenges(commit_vector)
         for j in range(len(commit_vector)):
-            coeff_s_not_t = polyfromroots(set_s_not_t[j])
-            listpoints_s_not_t = [(pp_commit_G2.__getitem__(i)).mul(coeff_s_not_t[i]) for i in
-                                  range(len(coeff_s_not_t))]
-            temp_sum = ec_sum(listpoints_s_not_t)
-            Cstring = b",".join([hexlify(commit_vector[j].export())])
-            chash = sha256(Cstring).digest()
-            hash_i = Bn.from_binary(chash)
-            GT_element = group.pair(commit_vector[j], hash_i * temp_sum)
-            vector_GT.append(GT_element)
-        left_side = product_GT(vector_GT)
-        # check both sides
-        return right_side.eq(left_side)
+            hash_i = hashes[j]
+            equation.append((msm([commit_vector[j]], [order - hash_i]), not_t_elements_sums[j]))
+        return equation
+
+    @staticmethod
+    def param_fingerprint(param_sc):
+        """ a hash of all G2 bases of the public parameters, which are the points of a prepared policy """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+        H = sha256(b"%d;" % len(pp_commit_G2))
+        for base in list(pp_commit_G2) + [g_2]:
+            encoded = base.export()
+            H.update(b"%d:" % len(encoded) + encoded)
+        return H.digest()
+
+    @staticmethod
+    def policy_key(param_sc, subsets_vector_str, fingerprint=None):
+        """
+        A canonical hash of the public parameters and a disclosure policy (the subsets vector), where the order of
+        the subsets matters but not the order of the messages in a subset.
 
+        :param fingerprint: the param_fingerprint of param_sc, computed if not given
+        """
+        if fingerprint is None:
+            fingerprint = CrossSetCommitment.param_fingerprint(param_sc)
+        H = sha256(fingerprint)
+        for subset in subsets_vector_str:
+            H.update(b"%d;" % len(subset))
+            for message in sorted(subset):
+                encoded = message.encode()
+                H.update(b"%d:" % len(encoded) + encoded)
+        return H.digest()
+
+    def prepared_policy(self, param_sc, subsets_vector_str):
+        """
+        Gives the G2 points of verify_cross that depend only on the subsets vector D, i.e., P_S for the union S
+        and P_{S not T_j} for every subset T_j, computed once per D (in affine coordinates) and cached for the most
+        recently used policies.
 
+        :param param_sc: public parameters
+        :param subsets_vector_str: the message sets vector
 
+        :return: P_S and a list of P_{S not T_j}
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+        key = self.policy_key(param_sc, subsets_vector_str, self.fingerprint(param_sc))
+        with self.prepared_policies_lock:
+            prepared = self.prepared_policies.get(key)
+            if prepared is not None:
+                self.prepared_policies.move_to_end(key)
+                return prepared
+
+        subsets_vector = [convert_mess_to_bn(item) for item in subsets_vector_str]
+        set_s = self.union(subsets_vector)
+        set_s_elements_sum = msm(pp_commit_G2, poly_from_roots(set_s, order))
+        not_t_elements_sums = [msm(pp_commit_G2, poly_from_roots(self.not_intersection(set_s, subset), order))
+                               for subset in subsets_vector]
+        prepared = (make_affine([set_s_elements_sum])[0], make_affine(not_t_elements_sums))
+        with self.prepared_policies_lock:
+            self.prepared_policies[key] = prepared
+            if len(self.prepared_policies) > MAX_PREPARED_POLICIES:
+                self.prepared_policies.popitem(last=False)
+        return prepared
+
+    def fingerprint(self, param_sc):
+        """
+        Gives the param_fingerprint of public parameters, computed once per parameters object. The parameters are
+        kept with their fingerprint, so the id of their G2 bases is not reused while it is a key.
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+        with self.prepared_policies_lock:
+            cached = self.param_fingerprints.get(id(pp_commit_G2))
+        if cached is not None and cached[0] is pp_commit_G2 and cached[1] is g_2:
+            return cached[2]
+        fingerprint = self.param_fingerprint(param_sc)
+        with self.prepared_policies_lock:
+            self.param_fingerprints[id(pp_commit_G2)] = (pp_commit_G2, g_2, fingerprint)
+            if len(self.param_fingerprints) > MAX_PARAM_FINGERPRINTS:
+                self.param_fingerprints.popitem(last=False)
+        return fingerprint
@@ -6,24 +6,115 @@ See the following for the details
 @Author: Omid Mir
 """
 
-from numpy.polynomial.polynomial import polyfromroots
 from core.set_commit import CrossSetCommitment
 from core.util import *
+from core.poly import poly_from_roots, poly_scale
+from core.zp import ZpVector, batch_inverse
+from core.context import Context
+import time
+
+
+def _generator_muls(bases, scalars, in_G2=False):
+    """ multiplies the generator bases[0] by each scalar, with its table if there is one """
+    if isinstance(bases, FixedBases) and bases.tables[0] is not None:
+        return [bases.tables[0].mul(scalar) for scalar in scalars]
+    return generator_mul(bases[0].group, scalars, in_G2)
+
+
+class UpdateKey:
+    """
+    An update key for the indices first, first + 1, ..., kept as the points of all indices in one flat list
+    (cardinality points per index) and a factor that multiplies all of them. Randomizing the key only changes the
+    factor, which is applied when change_rel uses an index (as part of its MSM).
+
+    The points do not change when the key is randomized, so apply() has to be used before the key is given to
+    another user (wire.encode does it).
+    """
+
+    def __init__(self, first, points, cardinality, factor=1):
+        """
+        :param first: the first index of the key
+        :param points: the points of all indices, index after index
+        :param cardinality: number of points of each index (max cardinality)
+        :param factor: a scalar that multiplies every point
+        """
+        self.first = first
+        self.points = points
+        self.cardinality = cardinality
+        self.factor = to_bn(factor)
+
+    @staticmethod
+    def from_dict(update_key):
+        """ converts an update key given as {index: points} with consecutive indices """
+        first = min(update_key)
+        return UpdateKey(first, [point for index in range(first, first + len(update_key)) for point in update_key[index]],
+                         len(update_key[first]))
+
+    def __len__(self):
+        return len(self.points) // self.cardinality
+
+    def __iter__(self):
+        return iter(range(self.first, self.first + len(self)))
+
+    def __contains__(self, index):
+        return self.first <= index < self.first + len(self)
+
+    def row(self, index):
+        """ :return: the points of an index without the factor """
+        start = (index - self.first) * self.cardinality
+        return self.points[start:start + self.cardinality]
+
+    def __getitem__(self, index):
+        """ :return: the points of an index (the factor is applied to each of them) """
+        if index not in self:
+            raise KeyError(index)
+        return [self.factor * point for point in self.row(index)] if self.factor != 1 else self.row(index)
+
+    def __eq__(self, other):
+        if not isinstance(other, UpdateKey):
+            return NotImplemented
+        return (self.first, self.cardinality) == (other.first, other.cardinality) and \
+            (self.points is other.points and self.factor == other.factor or self.apply().points == other.apply().points)
+
+    def get(self, index, default=None):
+        return self[index] if index in self else default
+
+    def randomize(self, scalar, order):
+        """ :return: the key multiplied by a scalar, which shares the points of this key """
+        return UpdateKey(self.first, self.points, self.cardinality, self.factor.mod_mul(to_bn(scalar), order))
+
+    def apply(self):
+        """ :return: the key with the factor applied to every point (and factor 1) """
+        if self.factor == 1:
+            return self
+        return UpdateKey(self.first, [self.factor * point for point in self.points], self.cardinality)
+
+    def mul(self, index, scalars, order):
+        """ :return: the MSM of the points of an index (with the factor) and scalars """
+        if self.factor != 1:
+            scalars = ZpVector(scalars, order).scale(self.factor)
+        return msm(self.row(index), scalars)
+
 
 class EQC_Sign:
-    def __init__(self, max_cardinal = 1):
-        """ Initializes the EQC_Sign class """
-        global max_cardinality, group
-        group = BpGroup()
-        max_cardinality = max_cardinal
-        self.csc_scheme =  CrossSetCommitment(max_cardinal)
+    def __init__(self, max_cardinal = 1, context=None):
+        """
+        Initializes the EQC_Sign class
+
+        :param max_cardinal: the maximum cardinality t
+        :param context: the parameters of the scheme (see context.py), a Context of max_cardinal by default
+        """
+        self.context = context if context is not None else Context(max_cardinal)
+        self.csc_scheme =  CrossSetCommitment(max_cardinal, self.context)
 
-    def setup(self):
+    def setup(self, table_budget=None):
         """
         Sets up the signature scheme by creating public parameters and a secret key
+
+        :param table_budget: bytes that fixed-base tables of the public parameters may use, none by default
         :return: public parameters and secret key
         """
-        pp_sign, alpha = self.csc_scheme.setup()
+        pp_sign, alpha = self.csc_scheme.setup(table_budget)
         return pp_sign, alpha
 
     def sign_keygen(self, pp_sign, l_message):
@@ -39,9 +130,9 @@ class EQC_Sign:
         # compute secret keys
         sk = [order.random() for _ in range(0, l_message)]
         # compute public keys
-        vk = [sk[i] * g_2 for i in range(len(sk))]
+        vk = [fixed_base_mul(pp_commit_G2, 0, sk[i]) for i in range(len(sk))]
         # compute X_0 keys that is used for delegation
-        X_0 = sk[0] * g_1
+        X_0 = fixed_base_mul(pp_commit_G1, 0, sk[0])
         vk.insert(0, X_0)
         return (sk, vk)
 
@@ -55,7 +146,7 @@ class EQC_Sign:
         (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
         # pick a random and compute key pair for users
         sk_u = order.random()
-        pk_u = sk_u * g_1
+        pk_u = fixed_base_mul(pp_commit_G1, 0, sk_u)
         return (sk_u, pk_u)
 
     def encode(self, pp_sign, mess_set):
@@ -83,7 +174,7 @@ class EQC_Sign:
         :return: a randomized commitment and opening information
         """
         rndmz_commit_vector = [mu * item for item in commitment_vector]
-        rndmz_opening_vector = [mu * item for item in opening_vector]
+        rndmz_opening_vector = ZpVector(opening_vector, self.context.order).scale(mu).to_bn()
         return (rndmz_commit_vector, rndmz_opening_vector)
 
     def rndmz_pk(self,pp_sign, pk_u, psi, chi):
@@ -99,7 +190,7 @@ class EQC_Sign:
         """
         (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
         # randomize pk as described in the paper
-        rndmz_pk_u= psi * (pk_u + chi * g_1)
+        rndmz_pk_u= psi * (pk_u + fixed_base_mul(pp_commit_G1, 0, chi))
         return rndmz_pk_u
 
     def sign(self, pp_sign, pk_u, sk, messages_vector, k_prime = None):
@@ -127,29 +218,83 @@ class EQC_Sign:
         # pick randomness y
         y = order.random()
         # compute sign -> sigma = (Z, Y, hat Ym T)
-        list_Z = [sk[i + 2] * commitment_vector[i] for i in range(len(commitment_vector))]
-        temp_point = ec_sum(list_Z)
-        Z = y.mod_inverse(order) * temp_point
-        Y = y * g_1
-        Y_hat = y * g_2
+        y_inverse = y.mod_inverse(order)
+        Z = msm(commitment_vector, ZpVector(sk[2:len(commitment_vector) + 2], order).scale(y_inverse))
+        Y = fixed_base_mul(pp_commit_G1, 0, y)
+        Y_hat = fixed_base_mul(pp_commit_G2, 0, y)
         T = sk[1] * Y + sk[0] * pk_u
         sigma = (Z, Y, Y_hat, T)
 
         #check if the update keyis requested then compute update key using k_prime, otherwise compute signature without it
         if k_prime != None:
             if k_prime > len(messages_vector):
-                usign = {}
-                for item in range(len(messages_vector) + 1, k_prime + 1):
-                    UK = [(y.mod_inverse(order) * sk[item + 1]) * pp_commit_G1[i] for i in range(max_cardinality)]
-                    usign[item] = UK
-                    update_key = usign
+                # the scalars y^-1 * sk[item + 1] of all update key items, with y inverted once
+                uk_scalars = ZpVector(sk[len(messages_vector) + 2:k_prime + 2], order).scale(y_inverse).to_bn()
+                update_key = UpdateKey(len(messages_vector) + 1, [fixed_base_mul(pp_commit_G1, i, scalar)
+                                                                  for scalar in uk_scalars for i in range(self.context.max_cardinality)],
+                                       self.context.max_cardinality)
                 return (sigma, update_key, commitment_vector, opening_vector)
             else:
                 print("not a good index, k_prime index should be greater  than message length")
         else:
             return (sigma, commitment_vector, opening_vector)
 
-    def change_rep(self, pp_sign, vk, pk_u, commitment_vector, opening_vector, sigma, mu, psi, B=False, update_key=None):
+    def sign_batch(self, pp_sign, requests, sk):
+        """
+        Generates signatures for many users and message vectors, as sign does for each of them. The polynomials of
+        repeated message sets are computed once, all y are inverted together, Y and Y_hat use the precomputed tables
+        of g_1 and g_2 (or the generator precomputation of the library), and T is one small MSM.
+
+        :param pp_sign: signature public parameters
+        :param requests: a list of (pk_u, messages_vector) or (pk_u, messages_vector, k_prime)
+        :param sk: signing key
+
+        :return: a list of the outputs of sign, one for each request (None for a k_prime that is not greater than
+            the message length, as sign gives), and the timing of the batch as a dict
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
+        start = time.perf_counter()
+
+        # encode all message sets of all requests, sharing the polynomials of repeated sets
+        commitments = self.csc_scheme.commit_sets(pp_sign, [mess for request in requests for mess in request[1]])
+        encoded = time.perf_counter()
+
+        ys = [order.random() for _ in requests]
+        y_inverses = batch_inverse(ys, order)
+        Ys = _generator_muls(pp_commit_G1, ys)
+        Y_hats = _generator_muls(pp_commit_G2, ys, in_G2=True)
+
+        results = []
+        position = 0
+        for n in range(len(requests)):
+            (pk_u, messages_vector) = requests[n][:2]
+            k_prime = requests[n][2] if len(requests[n]) > 2 else None
+            commitment_vector = [commitment for (commitment, opening) in commitments[position:position + len(messages_vector)]]
+            opening_vector = [opening for (commitment, opening) in commitments[position:position + len(messages_vector)]]
+            position += len(messages_vector)
+
+            Z = msm(commitment_vector, ZpVector(sk[2:len(commitment_vector) + 2], order).scale(y_inverses[n]))
+            T = msm([Ys[n], pk_u], [sk[1], sk[0]])
+            sigma = (Z, Ys[n], Y_hats[n], T)
+            if k_prime is not None and k_prime > len(messages_vector):
+                uk_scalars = ZpVector(sk[len(messages_vector) + 2:k_prime + 2], order).scale(y_inverses[n]).to_bn()
+                update_key = UpdateKey(len(messages_vector) + 1, [fixed_base_mul(pp_commit_G1, i, scalar)
+                                                                  for scalar in uk_scalars for i in range(self.context.max_cardinality)],
+                                       self.context.max_cardinality)
+                results.append((sigma, update_key, commitment_vector, opening_vector))
+            elif k_prime is not None:
+                print("not a good index, k_prime index should be greater  than message length")
+                results.append(None)
+            else:
+                results.append((sigma, commitment_vector, opening_vector))
+
+        end = time.perf_counter()
+        timing = {"count": len(requests), "seconds": end - start, "encode_seconds": encoded - start,
+                  "sign_seconds": end - encoded, "seconds_per_signature": (end - start) / max(len(requests), 1)}
+        return results, timing
+
+    def change_rep(self, pp_sign, vk, pk_u, commitment_vector, opening_vector, sigma, mu, psi, B=False, update_key=None,
+                   offline=None):
         """
           Change representation of the signature message pair to a new commitment vector and user public key.
 
@@ -163,34 +308,37 @@ class EQC_Sign:
         :param psi: randomness is used to randomize commitment vector and signature accordingly
         :param B: a falge to determine if it needs to randomize upda key as well or not
         :param update_key: update key, it can be none in the case that no need for randomization
+        :param offline: values precomputed for mu and psi (see randomizer.py), as (mu / psi, chi, chi * g_1, chi * vk[0])
 
         :return: a randomization of message-signature pair
         """
         (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
-        # pick randomness
-        chi = order.random()
+        if offline is None:
+            # pick randomness, mu / psi is used for Z and every element of the update key, so psi is inverted once
+            chi = order.random()
+            mu_psi_inverse = mu.mod_mul(psi.mod_inverse(order), order)
+            (chi_g_1, chi_vk) = (fixed_base_mul(pp_commit_G1, 0, chi), chi * vk[0])
+        else:
+            (mu_psi_inverse, chi, chi_g_1, chi_vk) = offline
 
         # randomize Commitment and opening vectors and user public key with randomness mu, chi
         rndmz_commitment_vector, rndmz_opening_vector = self.rndmz_commit(commitment_vector, opening_vector, mu)
-        rndmz_pk_u = self.rndmz_pk(pp_sign, pk_u, psi, chi)
+        rndmz_pk_u = psi * (pk_u + chi_g_1)
 
         # adapt the signiture for the randomized coomitment vector and PK_u_prime
         (Z, Y, Y_hat, T) = sigma
-        Z_prime = (mu * psi.mod_inverse(order)) * Z
+        Z_prime = mu_psi_inverse * Z
         Y_prime = psi * Y
         Y_hat_prime = psi * Y_hat
-        T_prime = psi * (T + chi * vk[0])
+        T_prime = psi * (T + chi_vk)
         sigma_prime = (Z_prime, Y_prime, Y_hat_prime, T_prime)
 
         # Check if it is allowed to randomize update_key for further delegation, if yes then randomize it
+        # (only its factor changes, see UpdateKey)
         if B == True and update_key != None:
-            usign = update_key
-            usign_prime = {}
-            for key in usign:
-                update_keylist = usign.get(key)
-                mainop = [(mu * psi.mod_inverse(order)) * update_keylist[i] for i in range(max_cardinality)]
-                usign_prime[key] = mainop
-            rndmz_update_key = usign_prime
+            if isinstance(update_key, dict):
+                update_key = UpdateKey.from_dict(update_key)
+            rndmz_update_key = update_key.randomize(mu_psi_inverse, order)
             return (sigma_prime, rndmz_update_key, rndmz_commitment_vector, rndmz_opening_vector, rndmz_pk_u, chi)
         else:
             return (sigma_prime, rndmz_commitment_vector, rndmz_opening_vector, rndmz_pk_u, chi)
@@ -210,7 +358,8 @@ class EQC_Sign:
 
         :return: a new singitre including the message set l
         """
-        usign = update_key
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
+        usign = UpdateKey.from_dict(update_key) if isinstance(update_key, dict) else update_key
         Z, Y, Y_hat, T = sigma
         commitment_L, opening_L = self.encode(pp_sign, message_l)
         rndmz_commitment_L, rndmz_opening_L = mu * commitment_L, mu * opening_L
@@ -218,11 +367,8 @@ class EQC_Sign:
         # add the commitment CL for index L into the signature, the update commitment vector and opening for this new commitment
         if (index_l in usign):
             set_l = convert_mess_to_bn(message_l)
-            monypolcoefficient = polyfromroots(set_l)
-            list = usign.get(index_l)
-            points_uk_i = [(list[i]).mul(monypolcoefficient[i]) for i in range(len(monypolcoefficient))]
-            ret = ec_sum(points_uk_i)
-            gama_l = ret.mul(opening_L)
+            monypolcoefficient = poly_from_roots(set_l, order)
+            gama_l = usign.mul(index_l, poly_scale(monypolcoefficient, opening_L, order), order)
             Z_tilde = Z + gama_l
             sigma_tilde = (Z_tilde, Y, Y_hat, T)
             commitment_vector.append(rndmz_commitment_L)
@@ -277,12 +423,78 @@ class EQC_Sign:
         :return: check if signature is valid: 0/1
         """
         (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
+        # check each equation as a pairing product equal to one, i.e., with a single final exponentiation
+        equations = self.verify_equations(pp_sign, vk, pk_u, commitment_vector, sigma)
+        return all(pairing_check(group, equation) for equation in equations)
+
+    def verify_equations(self, pp_sign, vk, pk_u, commitment_vector, sigma):
+        """
+        Gives the pairing product equations checked by verify, so that they can be batched with other equations.
+
+        :param pp_sign: signature public parameters
+        :param vk: verification key
+        :param pk_u: user public key
+        :param commitment_vector: signed commitment vector
+        :param sigma: signature for commitment vector
+
+        :return: a list of equations, each a list of (G1, G2) pairs whose pairing product is one if sigma is valid
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
         (Z, Y, Y_hat, T) = sigma
 
-        # statment 1
-        right_side = group.pair(Z, Y_hat)
-        pairing_op = [group.pair(commitment_vector[j], vk[j + 3]) for j in range(len(commitment_vector))]
-        # statment 2
-        left_side = product_GT(pairing_op)
-        return (group.pair(Y, g_2) == group.pair(g_1, Y_hat)) and (group.pair(T, g_2) == group.pair(Y, vk[2]) * group.pair(pk_u, vk[1])) and (
-                right_side == left_side)
+        # e(Z, Y_hat) = prod e(C_j, vk[j + 3])
+        equation_Z = [(Z, Y_hat)] + [(commitment_vector[j].neg(), vk[j + 3]) for j in range(len(commitment_vector))]
+        # e(Y, g_2) = e(g_1, Y_hat)
+        equation_Y = [(Y, g_2), (g_1.neg(), Y_hat)]
+        # e(T, g_2) = e(Y, vk[2]) * e(pk_u, vk[1])
+        equation_T = [(T, g_2), (Y.neg(), vk[2]), (pk_u.neg(), vk[1])]
+        return [equation_Z, equation_Y, equation_T]
+
+
+class PreparedVerificationKey:
+    """
+    A verification key prepared for verifying many signatures under it. bplib has no API to keep the Miller loop
+    lines of fixed G2 points, so the fixed G2 points (g_2 and the keys in vk) are kept in affine coordinates and the
+    three verification equations are combined with small random exponents into one pairing product that has a
+    single pair for each G2 point, where only the G1 side depends on the signature.
+    """
+
+    def __init__(self, pp_sign, vk):
+        """
+        :param pp_sign: signature public parameters
+        :param vk: verification key
+        """
+        (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
+        self.group = group
+        self.order = order
+        self.g_1 = g_1
+        self.g_2 = make_affine([G2Elem.from_bytes(g_2.export(), group)])[0]
+        self.vk = [vk[0]] + make_affine([G2Elem.from_bytes(X.export(), group) for X in vk[1:]])
+
+    def verify_equation(self, pk_u, commitment_vector, sigma):
+        """
+        Gives the verification equations of EQC_Sign.verify combined into one pairing product equation.
+
+        :param pk_u: user public key
+        :param commitment_vector: signed commitment vector
+        :param sigma: signature for commitment vector
+
+        :return: a list of (G1, G2) pairs whose pairing product is one if sigma is valid (w.h.p. only if)
+        """
+        (Z, Y, Y_hat, T) = sigma
+        (r_Y, r_T) = (small_exponent(), small_exponent())
+        o = int(self.order)
+        # e(Z, Y_hat) / prod e(C_j, vk[j + 3]) * (e(Y, g_2) / e(g_1, Y_hat))^r_Y * (e(T, g_2) / e(Y, vk[2]) e(pk_u, vk[1]))^r_T
+        return [(msm([Z, self.g_1], [1, o - int(r_Y)]), Y_hat),
+                (msm([Y, T], [r_Y, r_T]), self.g_2),
+                (msm([Y], [o - int(r_T)]), self.vk[2]),
+                (msm([pk_u], [o - int(r_T)]), self.vk[1])] + \
+               [(commitment_vector[j].neg(), self.vk[j + 3]) for j in range(len(commitment_vector))]
+
+    def verify(self, pk_u, commitment_vector, sigma):
+        """
+        checks if the signature is valid, as EQC_Sign.verify
+
+        :return: check if signature is valid: 0/1
+        """
+        return pairing_check(self.group, self.verify_equation(pk_u, commitment_vector, sigma))
@@ -0,0 +1,98 @@
+"""
+Saving and loading the output of DAC.setup, so that many worker processes can share one set of public
+parameters (and precomputed tables) instead of generating them at every start.
+The file holds a SETUP record with the setup output and, if the set commitment parameters carry fixed-base
+tables, a TABLES record with all table entries as fixed-size uncompressed points. load_setup maps the file
+read-only, so its pages are shared by all processes, and a table entry is only decoded when it is first used.
+"""
+
+import mmap
+import os
+from core.util import FixedBases, FixedBaseTable
+from core.wire import encode, iter_records, SETUP, TABLES
+from bplib.bp import G1Elem, POINT_CONVERSION_UNCOMPRESSED
+
+
+class MappedFixedBaseTable(FixedBaseTable):
+    """ a fixed-base table whose entries are decoded from a (memory-mapped) buffer the first time they are used """
+
+    def __init__(self, base, window, view, point_size):
+        self.base = base
+        self.window = window
+        self.order = base.group.order()
+        self.rows = self.num_rows(window, self.order.num_bits())
+        self.view = view
+        self.point_size = point_size
+        self.entries = [None] * self.size()
+
+    def entry(self, i, digit):
+        k = i * ((1 << self.window) - 1) + digit - 1
+        if self.entries[k] is None:
+            encoded = bytes(self.view[k * self.point_size:(k + 1) * self.point_size])
+            self.entries[k] = type(self.base).from_bytes(encoded, self.base.group)
+        return self.entries[k]
+
+
+def _export_uncompressed(point):
+    return point.export(POINT_CONVERSION_UNCOMPRESSED) if isinstance(point, G1Elem) else point.export()
+
+
+def save_setup(path, setup, include_secret_key=False):
+    """
+    Writes the output of DAC.setup to a file.
+
+    :param path: path of the file
+    :param setup: (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) as returned by DAC.setup
+    :param include_secret_key: also save sk_ca (e.g. for issuer workers), otherwise it is loaded as None
+    """
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = setup
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+    saved = (pp_dac, proof_vk, vk_stm, sk_ca if include_secret_key else None, proof_alpha, alpha_stm)
+    # points are saved uncompressed, which takes more space but is much faster to load
+    records = [encode(SETUP, saved, compressed=False)]
+
+    tables = []
+    for position in (0, 1):
+        bases = pp_sign[position]
+        if isinstance(bases, FixedBases) and len(bases) > 0 and all(table is not None for table in bases.tables):
+            window = bases.tables[0].window
+            entries = b"".join(_export_uncompressed(point) for table in bases.tables for point in table.entries)
+            tables.append((position, window, len(_export_uncompressed(bases[0])), entries))
+    if len(tables) > 0:
+        records.append(encode(TABLES, tables))
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        if include_secret_key:
+            os.chmod(temp_path, 0o600)
+        for record in records:
+            f.write(record)
+    os.replace(temp_path, path)
+
+
+def load_setup(path, group=None):
+    """
+    Loads the output of DAC.setup saved by save_setup. Tables are backed by a read-only memory map of the file.
+
+    :param path: path of the file
+    :param group: bilinear group of the loaded points, a shared BpGroup by default
+    :return: (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm), where sk_ca is None if it was not saved
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    records = iter_records(memoryview(buffer), group)
+    (kind, setup) = next(records)
+    if kind != SETUP:
+        raise ValueError("not a setup file")
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = setup
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+
+    for (kind, tables) in records:
+        if kind != TABLES:
+            raise ValueError("unexpected record of kind %d in a setup file" % kind)
+        for (position, window, point_size, entries) in tables:
+            bases = pp_sign[position]
+            table_bytes = FixedBaseTable.num_points(window, bases[0].group.order().num_bits()) * point_size
+            bases.tables = [MappedFixedBaseTable(bases[i], window, entries[i * table_bytes:(i + 1) * table_bytes], point_size)
+                            for i in range(len(bases))]
+    return setup
@@ -0,0 +1,78 @@
+"""
+A binary transcript for Fiat-Shamir challenges. Points (by their export()), scalars, strings, bytes and lists of
+them are absorbed into SHA-256 with a type tag and a length, so that the encoding is canonical and unambiguous
+without formatting points as strings.
+
+    transcript = Transcript(b"schnorr").absorb(g, stm, W)
+    c = transcript.challenge(order)
+
+A transcript can be forked to derive several challenges from a common prefix.
+"""
+
+from hashlib import sha256
+from struct import Struct
+from bplib.bp import G1Elem, G2Elem
+from petlib.bn import Bn
+
+_FRAME = Struct(">BI")
+
+## tags of absorbed values
+_G1, _G2, _BN, _INT, _STR, _BYTES, _LIST, _LABEL = range(1, 9)
+
+
+class Transcript:
+    def __init__(self, label=b""):
+        """
+        :param label: a domain separation label (bytes or str)
+        """
+        self.H = sha256()
+        self._frame(_LABEL, label.encode("utf-8") if isinstance(label, str) else bytes(label))
+
+    def _frame(self, tag, data):
+        self.H.update(_FRAME.pack(tag, len(data)))
+        self.H.update(data)
+
+    def absorb(self, *items):
+        """
+        Absorbs values in order.
+
+        :param items: points, Bn or int scalars, strings, bytes, or lists and tuples of them
+        :return: the transcript itself
+        """
+        for item in items:
+            if isinstance(item, G1Elem):
+                self._frame(_G1, item.export())
+            elif isinstance(item, G2Elem):
+                self._frame(_G2, item.export())
+            elif isinstance(item, Bn):
+                self._frame(_BN, (b"-" if item < 0 else b"+") + abs(item).binary())
+            elif isinstance(item, int):
+                self._frame(_INT, (b"-" if item < 0 else b"+") + abs(item).to_bytes((abs(item).bit_length() + 7) // 8, "big"))
+            elif isinstance(item, str):
+                self._frame(_STR, item.encode("utf-8"))
+            elif isinstance(item, (bytes, bytearray, memoryview)):
+                self._frame(_BYTES, bytes(item))
+            elif isinstance(item, (list, tuple)):
+                self.H.update(_FRAME.pack(_LIST, len(item)))
+                self.absorb(*item)
+            else:
+                raise TypeError("cannot absorb %s" % type(item))
+        return self
+
+    def fork(self, label):
+        """ :return: a copy of the transcript that has absorbed label, this transcript is not changed """
+        forked = Transcript.__new__(Transcript)
+        forked.H = self.H.copy()
+        forked._frame(_LABEL, label.encode("utf-8") if isinstance(label, str) else bytes(label))
+        return forked
+
+    def digest(self):
+        return self.H.copy().digest()
+
+    def challenge(self, order=None):
+        """
+        :param order: reduce the challenge modulo order if given
+        :return: the challenge as a Bn, the transcript can still absorb more values
+        """
+        c = Bn.from_binary(self.digest())
+        return c % order if order is not None else c
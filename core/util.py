@@ -3,9 +3,16 @@ Some common and basic tools are used in the project, such as converting messages
 can be used in the bilinear pairing, EQ relations, and (trapdoor) Pederson commitment, 
 """
 
+from os import urandom
+from collections import OrderedDict
+from threading import Lock
 from termcolor import colored
 from coconut.scheme import *
 from coconut.utils import *
+from bplib.bp import G1Elem, G2Elem, GTElem, _check
+from bplib.bindings import _FFI, _C
+from core.zp import to_bn
+from core.context import shared_group
 
 # ==================================================
 # Setup parameters:
@@ -45,6 +52,183 @@ def ec_sum(list):
         ret = ret + list[i]
     return ret
 
+# ==================================================
+# Multi-scalar multiplication
+# ==================================================
+
+## number of points from which msm uses Pippenger's bucket method instead of the native multi-exponentiation
+PIPPENGER_THRESHOLD = 4096
+
+def msm(points, scalars):
+    """
+    Multi-scalar multiplication sum scalars[i] * points[i] of points in G1 or G2. Only the first len(scalars)
+    points are used, so that a list of public parameters can be passed as is.
+
+    :param points: a non-empty list of G1 or G2 elements
+    :param scalars: a list of scalars (Bn or int) with len(scalars) <= len(points)
+    :return: the sum of the scalar multiplications
+    """
+    if len(scalars) > len(points):
+        raise ValueError("%d scalars for %d points" % (len(scalars), len(points)))
+    points = points[:len(scalars)]
+    order = points[0].group.order()
+    scalars = [to_bn(scalar) % order for scalar in scalars]
+    if len(points) < PIPPENGER_THRESHOLD:
+        return _msm_straus(points, scalars)
+    return _msm_pippenger(points, scalars)
+
+def _msm_straus(points, scalars):
+    """ interleaved wNAF multi-exponentiation (Straus) of the underlying library """
+    group = points[0].group
+    if isinstance(points[0], G1Elem):
+        (ret, mul_C, points_type) = (G1Elem(group), _C.G1_ELEMs_mul, "const G1_ELEM *[]")
+    else:
+        (ret, mul_C, points_type) = (G2Elem(group), _C.G2_ELEMs_mul, "const G2_ELEM *[]")
+    list_points = _FFI.new(points_type, [point.elem for point in points])
+    list_scalars = _FFI.new("const BIGNUM *[]", [scalar.bn for scalar in scalars])
+    _check(mul_C(group.bpg, ret.elem, _FFI.NULL, len(points), list_points, list_scalars, _FFI.NULL))
+    return ret
+
+def _msm_pippenger(points, scalars):
+    """ Pippenger's bucket method, each window of c bits costs about n + 2^(c+1) additions """
+    window = min(max(2, len(points).bit_length() - 4), 16)
+    mask = (1 << window) - 1
+    scalars = [int(scalar) for scalar in scalars]
+    ret = None
+    for shift in reversed(range(0, max(scalar.bit_length() for scalar in scalars), window)):
+        if ret is not None:
+            for _ in range(window):
+                ret = ret.double()
+        # put each point into the bucket of its digit
+        buckets = [None] * mask
+        for (point, scalar) in zip(points, scalars):
+            digit = (scalar >> shift) & mask
+            if digit != 0:
+                bucket = buckets[digit - 1]
+                buckets[digit - 1] = point if bucket is None else bucket + point
+        # sum_d d * bucket_d as a sum of running sums
+        running, window_sum = None, None
+        for bucket in reversed(buckets):
+            if bucket is not None:
+                running = bucket if running is None else running + bucket
+            if running is not None:
+                window_sum = running if window_sum is None else window_sum + running
+        if window_sum is not None:
+            ret = window_sum if ret is None else ret + window_sum
+    return type(points[0]).inf(points[0].group) if ret is None else ret
+
+# ==================================================
+# Fixed-base precomputation
+# ==================================================
+
+## largest window (in bits) of a fixed-base table
+MAX_TABLE_WINDOW = 8
+
+class FixedBaseTable:
+    """ a windowed table of a fixed base P, row i holds d * 2^(w*i) * P for every non-zero digit d of w bits """
+
+    def __init__(self, base, window):
+        self.base = base
+        self.window = window
+        self.order = base.group.order()
+        self.rows = self.num_rows(window, self.order.num_bits())
+        # entries are kept row after row in a flat list
+        self.entries = []
+        row_base = base
+        for i in range(self.rows):
+            self.entries.append(row_base)
+            for d in range(2, 1 << window):
+                self.entries.append(self.entries[-1] + row_base)
+            row_base = self.entries[-1] + row_base
+
+    @staticmethod
+    def num_rows(window, bits):
+        return (bits + window - 1) // window
+
+    @staticmethod
+    def num_points(window, bits):
+        """ number of points held by a table with the given window for scalars of the given bits """
+        return FixedBaseTable.num_rows(window, bits) * ((1 << window) - 1)
+
+    def entry(self, i, digit):
+        """ the entry digit * 2^(w*i) * P """
+        return self.entries[i * ((1 << self.window) - 1) + digit - 1]
+
+    def mul(self, scalar):
+        """ multiplies the base by a scalar using only additions of table entries """
+        scalar = int(to_bn(scalar) % self.order)
+        (mask, ret) = ((1 << self.window) - 1, None)
+        for i in range(self.rows):
+            digit = scalar & mask
+            if digit != 0:
+                ret = self.entry(i, digit) if ret is None else ret + self.entry(i, digit)
+            scalar >>= self.window
+        return type(self.base).inf(self.base.group) if ret is None else ret
+
+    def size(self):
+        """ number of points in the table """
+        return self.rows * ((1 << self.window) - 1)
+
+
+class FixedBases(list):
+    """
+    A list of fixed bases, e.g., the set commitment public parameters, with optional precomputed tables
+    to multiply a single base by a new scalar.
+    """
+
+    def __init__(self, bases):
+        list.__init__(self, bases)
+        self.tables = [None] * len(self)
+
+    def precompute(self, memory_budget):
+        """
+        Builds a table for every base, using the largest window such that all tables fit in memory_budget.
+
+        :param memory_budget: bytes (counted in encoded points) that all tables of this list may use
+        """
+        if len(self) == 0 or not memory_budget:
+            return
+        (point_bytes, bits) = (len(self[0].export()), self[0].group.order().num_bits())
+        windows = [w for w in range(2, MAX_TABLE_WINDOW + 1)
+                   if len(self) * FixedBaseTable.num_points(w, bits) * point_bytes <= memory_budget]
+        if len(windows) > 0:
+            self.tables = [FixedBaseTable(base, max(windows)) for base in self]
+
+    def table_size(self):
+        """ number of points and bytes (in encoded form) held by the tables """
+        points = sum(table.size() for table in self.tables if table is not None)
+        return {"points": points, "bytes": points * len(self[0].export()) if len(self) > 0 else 0}
+
+
+def fixed_base_mul(bases, i, scalar):
+    """ multiplies bases[i] by a scalar, using its precomputed table if there is one """
+    table = bases.tables[i] if isinstance(bases, FixedBases) else None
+    return bases[i].mul(scalar) if table is None else table.mul(scalar)
+
+def table_size(param_sc):
+    """ number of points and bytes (in encoded form) held by the tables of the set commitment public parameters """
+    (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = param_sc
+    sizes = [bases.table_size() for bases in (pp_commit_G1, pp_commit_G2) if isinstance(bases, FixedBases)]
+    return {"points": sum(size["points"] for size in sizes), "bytes": sum(size["bytes"] for size in sizes)}
+
+def generator_mul(group, scalars, in_G2=False):
+    """
+    Multiplies the generator of G1 (or G2) by each scalar, using the generator precomputation of the underlying
+    library (done by BpGroup by default) instead of a plain scalar multiplication.
+
+    :param group: bilinear group BpGroup
+    :param scalars: a list of scalars (Bn or int)
+    :param in_G2: use the generator of G2 instead of G1
+    :return: a list of points
+    """
+    (elem_type, mul_C) = (G2Elem, _C.G2_ELEMs_mul) if in_G2 else (G1Elem, _C.G1_ELEMs_mul)
+    points = []
+    for scalar in scalars:
+        point = elem_type(group)
+        _check(mul_C(group.bpg, point.elem, to_bn(scalar).bn, 0, _FFI.NULL, _FFI.NULL, _FFI.NULL))
+        points.append(point)
+    return points
+
 def product_GT(list_GT):
     """ pairing product equations of a list """
     ret_GT = list_GT[0]
@@ -52,6 +236,76 @@ def product_GT(list_GT):
         ret_GT = ret_GT * (list_GT[i])
     return ret_GT
 
+def multi_pair(group, pairs):
+    """
+    Computes the pairing product prod e(P_i, Q_i) of a list of (G1, G2) pairs. The Miller loops of all
+    pairs are accumulated into one value and a single final exponentiation is applied at the end.
+    Pairs with the same G2 point are merged in G1 and pairs with a point at infinity are dropped first, since
+    the multi-pairing of the underlying library fails or is wrong for them (e.g. for (P, Q), (-P, Q)).
+
+    :param group: bilinear group BpGroup
+    :param pairs: a list of (G1, G2) pairs
+    :return: an element of GT
+    """
+    merged = {}
+    for (elem_G1, elem_G2) in pairs:
+        if elem_G1.isinf() or elem_G2.isinf():
+            continue
+        merged[elem_G2] = elem_G1 + merged[elem_G2] if elem_G2 in merged else elem_G1
+    pairs = [(elem_G1, elem_G2) for (elem_G2, elem_G1) in merged.items() if not elem_G1.isinf()]
+    if len(pairs) == 0:
+        return GTElem.one(group)
+    gt = GTElem(group)
+    list_G1 = _FFI.new("const G1_ELEM *[]", [elem_G1.elem for (elem_G1, elem_G2) in pairs])
+    list_G2 = _FFI.new("const G2_ELEM *[]", [elem_G2.elem for (elem_G1, elem_G2) in pairs])
+    _check(_C.GT_ELEMs_pairing(group.bpg, gt.elem, len(pairs), list_G1, list_G2, _FFI.NULL))
+    return gt
+
+def make_affine(points):
+    """
+    Converts points to affine coordinates in place, so that pairings with them (e.g. fixed G2 points of keys)
+    do not need to convert them at every use.
+
+    :param points: a list of G1 or G2 points
+    :return: the same list of points
+    """
+    for point in points:
+        make_affine_C = _C.G2_ELEM_make_affine if isinstance(point, G2Elem) else _C.G1_ELEM_make_affine
+        _check(make_affine_C(point.group.bpg, point.elem, _FFI.NULL))
+    return points
+
+def pairing_check(group, pairs):
+    """ checks a pairing product equation, i.e., if prod e(P_i, Q_i) of a list of (G1, G2) pairs is one """
+    return multi_pair(group, pairs).isone()
+
+# ==================================================
+# Batch verification
+# ==================================================
+
+## bit length of the random exponents used to combine pairing product equations
+SMALL_EXPONENT_BITS = 64
+
+def small_exponent():
+    """ pick a random non-zero exponent of SMALL_EXPONENT_BITS bits """
+    return Bn.from_binary(urandom(SMALL_EXPONENT_BITS // 8)) + 1
+
+def combine_equations(equations):
+    """
+    Combines pairing product equations into one (small-exponent batch verification). Each equation is
+    raised to an independent random exponent and terms sharing the same G2 element are merged in G1.
+
+    :param equations: a list of equations, each a list of (G1, G2) pairs whose pairing product should be one
+    :return: a list of (G1, G2) pairs whose pairing product is one if all equations hold (w.h.p. only if)
+    """
+    merged = {}
+    for equation in equations:
+        delta = small_exponent()
+        for (elem_G1, elem_G2) in equation:
+            (points, scalars) = merged.setdefault(elem_G2, ([], []))
+            points.append(elem_G1)
+            scalars.append(delta)
+    return [(msm(points, scalars), elem_G2) for (elem_G2, (points, scalars)) in merged.items()]
+
 # ==================================================
 # Attribute Representation:
 # ==================================================
@@ -71,6 +325,61 @@ def eq_dh_relation(dh_message_vector, mu, opsilon):
     return dh_message_representive
 
 
+class AttributeEncoder:
+    """
+    Encodes attributes (strings) as Zp elements (Bn) or as G1 elements, keeping the most recently used encodings
+    in a bounded LRU cache since the attribute vocabulary is usually small and heavily repeated.
+    """
+
+    def __init__(self, maxsize=4096, group=None):
+        """
+        :param maxsize: the maximum number of cached encodings (0 disables the cache)
+        :param group: bilinear group used to hash into G1, one shared BpGroup is created when first needed
+        """
+        self.maxsize = maxsize
+        self.group = group
+        self.hits, self.misses = 0, 0
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def _lookup(self, key, encode):
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
+        value = encode()
+        if self.maxsize > 0:
+            with self._lock:
+                self._cache[key] = value
+                if len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return value
+
+    def to_bn(self, message):
+        """ encodes a message as a Bn """
+        return self._lookup(("bn", message), lambda: Bn.from_binary(str.encode(message)))
+
+    def to_G1(self, message):
+        """ encodes a message as an element of G1 by hashing it """
+        if self.group is None:
+            self.group = shared_group()
+        return self._lookup(("G1", message), lambda: self.group.hashG1(message.encode()))
+
+    def stats(self):
+        """ hit and miss counters and the size of the cache """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache), "maxsize": self.maxsize}
+
+    def clear(self):
+        """ empties the cache and resets the counters """
+        with self._lock:
+            self._cache.clear()
+            self.hits, self.misses = 0, 0
+
+## the encoder shared by all schemes
+attribute_encoder = AttributeEncoder()
+
 def convert_mess_to_groups(message_vector):
     """
     :param: get a vector of strings or vector of vector strings as message_vector
@@ -78,20 +387,20 @@ def convert_mess_to_groups(message_vector):
     """
     message_group_vector = []
     if type(message_vector[0])== str:
-        message_group_vector = [BpGroup().hashG1(message.encode()) for message in message_vector]
+        message_group_vector = [attribute_encoder.to_G1(message) for message in message_vector]
     else:
         for message in message_vector:
-            temp = [BpGroup().hashG1(message[i].encode()) for i in range(len(message))]
+            temp = [attribute_encoder.to_G1(message[i]) for i in range(len(message))]
             message_group_vector.append(temp)
 
     return message_group_vector
 
 def convert_mess_to_bn(messages):
     if type(messages)==str:
-        Conver_message = Bn.from_binary(str.encode(messages))
+        Conver_message = attribute_encoder.to_bn(messages)
     elif isinstance(messages, set) or isinstance(messages, list):
         try:
-            Conver_message = list(map(lambda item: Bn.from_binary(str.encode(item)), messages))
+            Conver_message = list(map(attribute_encoder.to_bn, messages))
         except:
             print(colored('insert all messages as string', 'green'))
     else:
@@ -0,0 +1,217 @@
+"""
+A compact, versioned binary wire format for the public parameters, credentials, update keys and proofs of
+the DAC scheme. Each record has a fixed header followed by a length-prefixed body:
+
+    magic (2 bytes) || version (1 byte) || kind (1 byte) || body length (4 bytes) || body
+
+The body is a tagged encoding of the (nested) tuples, lists and dicts of points and Bn numbers returned by the
+schemes, and of update keys (with their factor applied, see spseq_uc.UpdateKey). G1 points use their compressed export() and G2 points their export() (bplib only encodes G2 points
+uncompressed), and attributes are UTF-8 strings. Decoding works on bytes or a memoryview without copying the
+buffer (byte strings decode as memoryviews into it), and iter_records reads a stream of concatenated records.
+"""
+
+from struct import Struct, error as struct_error
+from bplib.bp import BpGroup, G1Elem, G2Elem, POINT_CONVERSION_UNCOMPRESSED
+from petlib.bn import Bn
+from core.util import FixedBases
+from core.context import shared_group
+from core.spseq_uc import UpdateKey
+
+MAGIC = b"DC"
+VERSION = 1
+
+## kinds of records
+PP_DAC, CRED, UPDATE_KEY, PROOF, PROOF_NYM, SETUP, TABLES, DELEGATION, ABORT = 1, 2, 3, 4, 5, 6, 7, 8, 9
+
+_HEADER = Struct(">2sBBI")
+HEADER_SIZE = _HEADER.size
+_U8, _U16, _U32, _I64 = Struct(">B"), Struct(">H"), Struct(">I"), Struct(">q")
+
+## tags of encoded values
+_NONE, _G1, _G2, _BN, _BN_NEG, _INT, _LIST, _TUPLE, _DICT, _GROUP, _FIXED_BASES, _BYTES, _STR, _UPDATE_KEY = range(14)
+
+def _get_default_group():
+    """ the group used for decoding when none is given """
+    return shared_group()
+
+
+def _encode_value(obj, out, compressed=True):
+    if obj is None:
+        out += _U8.pack(_NONE)
+    elif isinstance(obj, G1Elem):
+        point = obj.export() if compressed else obj.export(POINT_CONVERSION_UNCOMPRESSED)
+        out += _U8.pack(_G1) + _U8.pack(len(point)) + point
+    elif isinstance(obj, G2Elem):
+        point = obj.export()
+        out += _U8.pack(_G2) + _U16.pack(len(point)) + point
+    elif isinstance(obj, Bn):
+        number = obj.binary()
+        out += _U8.pack(_BN_NEG if obj < 0 else _BN) + _U16.pack(len(number)) + number
+    elif isinstance(obj, int):
+        out += _U8.pack(_INT) + _I64.pack(obj)
+    elif isinstance(obj, BpGroup):
+        out += _U8.pack(_GROUP) + _U32.pack(obj.nid)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        out += _U8.pack(_BYTES) + _U32.pack(len(obj)) + bytes(obj)
+    elif isinstance(obj, str):
+        text = obj.encode("utf-8")
+        out += _U8.pack(_STR) + _U32.pack(len(text)) + text
+    elif isinstance(obj, (list, tuple)):
+        tag = _FIXED_BASES if isinstance(obj, FixedBases) else _TUPLE if isinstance(obj, tuple) else _LIST
+        out += _U8.pack(tag) + _U32.pack(len(obj))
+        for item in obj:
+            _encode_value(item, out, compressed)
+    elif isinstance(obj, UpdateKey):
+        # the factor is applied, so that the points of a randomized key do not link it to the original key
+        update_key = obj.apply()
+        out += _U8.pack(_UPDATE_KEY) + _U32.pack(update_key.first) + _U32.pack(update_key.cardinality)
+        _encode_value(update_key.points, out, compressed)
+    elif isinstance(obj, dict):
+        out += _U8.pack(_DICT) + _U32.pack(len(obj))
+        for key in obj:
+            _encode_value(key, out, compressed)
+            _encode_value(obj[key], out, compressed)
+    else:
+        raise TypeError("cannot encode %s" % type(obj))
+
+
+def _decode_value(view, pos, group):
+    """ decodes the value starting at pos, and returns it with the position that follows it """
+    tag = view[pos]
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _G1:
+        size = view[pos]
+        return G1Elem.from_bytes(bytes(view[pos + 1:pos + 1 + size]), group), pos + 1 + size
+    if tag == _G2:
+        size = _U16.unpack_from(view, pos)[0]
+        return G2Elem.from_bytes(bytes(view[pos + 2:pos + 2 + size]), group), pos + 2 + size
+    if tag in (_BN, _BN_NEG):
+        size = _U16.unpack_from(view, pos)[0]
+        number = Bn.from_binary(bytes(view[pos + 2:pos + 2 + size]))
+        return (number.int_neg() if tag == _BN_NEG else number), pos + 2 + size
+    if tag == _INT:
+        return _I64.unpack_from(view, pos)[0], pos + 8
+    if tag == _GROUP:
+        nid = _U32.unpack_from(view, pos)[0]
+        return (group if group.nid == nid else shared_group(nid)), pos + 4
+    if tag == _BYTES:
+        size = _U32.unpack_from(view, pos)[0]
+        if pos + 4 + size > len(view):
+            raise IndexError("bytes out of range")
+        return view[pos + 4:pos + 4 + size], pos + 4 + size
+    if tag == _STR:
+        size = _U32.unpack_from(view, pos)[0]
+        if pos + 4 + size > len(view):
+            raise IndexError("string out of range")
+        return bytes(view[pos + 4:pos + 4 + size]).decode("utf-8"), pos + 4 + size
+    if tag in (_LIST, _TUPLE, _FIXED_BASES):
+        count = _U32.unpack_from(view, pos)[0]
+        pos += 4
+        items = []
+        for _ in range(count):
+            item, pos = _decode_value(view, pos, group)
+            items.append(item)
+        if tag == _TUPLE:
+            return tuple(items), pos
+        return (FixedBases(items) if tag == _FIXED_BASES else items), pos
+    if tag == _DICT:
+        count = _U32.unpack_from(view, pos)[0]
+        pos += 4
+        items = {}
+        for _ in range(count):
+            key, pos = _decode_value(view, pos, group)
+            items[key], pos = _decode_value(view, pos, group)
+        return items, pos
+    if tag == _UPDATE_KEY:
+        (first, cardinality) = (_U32.unpack_from(view, pos)[0], _U32.unpack_from(view, pos + 4)[0])
+        points, pos = _decode_value(view, pos + 8, group)
+        if cardinality == 0 or not isinstance(points, list) or len(points) % cardinality != 0:
+            raise ValueError("malformed update key")
+        return UpdateKey(first, points, cardinality), pos
+    raise ValueError("unknown tag %d" % tag)
+
+
+def encode(kind, obj, compressed=True):
+    """
+    Encodes an object as a record.
+
+    :param kind: the kind of record (PP_DAC, CRED, UPDATE_KEY, PROOF, PROOF_NYM, ...)
+    :param obj: public parameters, a credential, an update key, a proof, a proof of nym, ...
+    :param compressed: encode G1 points compressed, which is smaller but slower to decode
+    :return: the record as bytes
+    """
+    body = bytearray()
+    _encode_value(obj, body, compressed)
+    return _HEADER.pack(MAGIC, VERSION, kind, len(body)) + bytes(body)
+
+
+def read_header(header):
+    """ :return: the kind and the body length of a record from its header (HEADER_SIZE bytes) """
+    (magic, version, kind, length) = _HEADER.unpack_from(header, 0)
+    if magic != MAGIC:
+        raise ValueError("not a DAC record")
+    if version != VERSION:
+        raise ValueError("unsupported record version %d" % version)
+    return kind, length
+
+
+def decode(data, kind=None, group=None):
+    """
+    Decodes a single record.
+
+    :param data: bytes or memoryview holding the record
+    :param kind: the expected kind of record, any kind by default
+    :param group: bilinear group of the decoded points, a shared BpGroup by default
+    :return: the kind of the record and the decoded object
+    """
+    (obj_kind, obj, end) = _decode_record(memoryview(data), 0, group)
+    if kind is not None and obj_kind != kind:
+        raise ValueError("expected a record of kind %d, got %d" % (kind, obj_kind))
+    return obj_kind, obj
+
+
+def _decode_record(view, pos, group):
+    group = group if group is not None else _get_default_group()
+    if pos + _HEADER.size > len(view):
+        raise ValueError("truncated record")
+    (kind, length) = read_header(view[pos:pos + _HEADER.size])
+    start = pos + _HEADER.size
+    if start + length > len(view):
+        raise ValueError("truncated record")
+    try:
+        # restrict the view to this record, so a malformed body cannot run into the next one
+        (obj, end) = _decode_value(view[:start + length], start, group)
+    except (IndexError, struct_error):
+        raise ValueError("malformed record")
+    if end != start + length:
+        raise ValueError("record length does not match its content")
+    return kind, obj, end
+
+
+def iter_records(source, group=None):
+    """
+    Reads concatenated records one at a time.
+
+    :param source: bytes, a memoryview or a binary file-like object with read()
+    :param group: bilinear group of the decoded points, a shared BpGroup by default
+    :return: a generator of (kind, object)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        (view, pos) = (memoryview(source), 0)
+        while pos < len(view):
+            (kind, obj, pos) = _decode_record(view, pos, group)
+            yield kind, obj
+    else:
+        while True:
+            header = source.read(_HEADER.size)
+            if len(header) == 0:
+                return
+            if len(header) < _HEADER.size:
+                raise ValueError("truncated record")
+            (kind, length) = read_header(header)
+            body = source.read(length)
+            if len(body) < length:
+                raise ValueError("truncated record")
+            yield decode(header + body, group=group)
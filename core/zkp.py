@@ -4,8 +4,50 @@ and Damgard’s compiler for obtaining malicious-verifier interactive zero-knowl
 """
 
 from petlib.bn import Bn
-from hashlib import sha256
-from core.util import pedersen_setup, pedersen_committ, pedersen_dec, ec_sum
+from core.transcript import Transcript
+from core.util import pedersen_setup, pedersen_committ, pedersen_dec, ec_sum, msm, small_exponent
+
+
+def combine_linear_equations(equations, order):
+    """
+    Combines linear equations sum_i scalars[i] * points[i] = 0 into one (small-exponent batch verification):
+    each equation is multiplied by an independent random exponent, and the terms of the same point object are
+    merged.
+
+    :param equations: a list of (points, scalars)
+    :param order: order of the group
+    :return: (points, scalars) of the combined equation
+    """
+    o = int(order)
+    merged = {}
+    for (points, scalars) in equations:
+        delta = int(small_exponent())
+        for point, scalar in zip(points, scalars):
+            (base, total) = merged.get(id(point), (point, 0))
+            merged[id(point)] = (base, (total + delta * int(scalar)) % o)
+    return [base for (base, total) in merged.values()], [total for (base, total) in merged.values()]
+
+
+def verify_batch_bisect(equations, order, indices, verdicts):
+    """
+    Checks the combined equations of the proofs in indices, and splits the batch in halves if it fails, so the
+    invalid proofs are found with a few more checks.
+
+    :param equations: a list with the linear equations of each proof
+    :param order: order of the group
+    :param indices: the proofs to check
+    :param verdicts: a list of 0/1 that is set for the proofs in indices
+    """
+    if len(indices) == 0:
+        return
+    (points, scalars) = combine_linear_equations([equation for i in indices for equation in equations[i]], order)
+    if msm(points, scalars).isinf():
+        for i in indices:
+            verdicts[i] = True
+    elif len(indices) > 1:
+        half = len(indices) // 2
+        verify_batch_bisect(equations, order, indices[:half], verdicts)
+        verify_batch_bisect(equations, order, indices[half:], verdicts)
 
 
 class ZKP_Schnorr_FS:
@@ -22,14 +64,8 @@ class ZKP_Schnorr_FS:
         return params
 
     def challenge(self, elements):
-        """Packages a challenge in a bijective way"""
-        elem = [len(elements)] + elements
-        elem_str = map(str, elem)
-        elem_len = map(lambda x: "%s||%s" % (len(x), x), elem_str)
-        state = "|".join(elem_len)
-        H = sha256()
-        H.update(state.encode("utf8"))
-        return Bn.from_binary(H.digest())
+        """Packages a challenge in a bijective way, see Transcript"""
+        return Transcript(b"ZKP_Schnorr_FS").absorb(elements).challenge()
 
 
     def non_interact_prove(self, params, stm, secret_wit):
@@ -39,14 +75,14 @@ class ZKP_Schnorr_FS:
             w_list = [o.random() for i in range(len(stm))]
             W_list = [w_list[i] * g for i in range(len(w_list))]
             Anoncment = ec_sum(W_list)
-            state = ['schnorr', g, stm, Anoncment.__hash__()]
+            state = ['schnorr', g, stm, Anoncment]
             c = self.challenge(state) % o
             r = [(w_list[i] - c * secret_wit[i]) % o for i in range(len(secret_wit))]
             return (r, c)
         else:
             w = o.random()
             W = w * g
-            state = ['schnorr', g, stm, W.__hash__()]
+            state = ['schnorr', g, stm, W]
             c = self.challenge(state) % o
             # hash_c = challenge(state)
             # c = Bn.from_binary(hash_c) % o
@@ -60,14 +96,14 @@ class ZKP_Schnorr_FS:
         (r, c) = proof_list
 
         if isinstance(stm, list) == True:
-            W_list = [r[i] * g + c * stm[i] for i in range(len(r))]
-            Anoncment = ec_sum(W_list)
-            state = ['schnorr', g, stm, Anoncment.__hash__()]
+            # the sum of r[i] * g + c * stm[i] as one MSM
+            Anoncment = msm([g] + stm, [sum(r) % o] + [c] * len(stm))
+            state = ['schnorr', g, stm, Anoncment]
             hash = slef.challenge(state) % o
             return c == hash
         else:
-            W = (r * g + c * stm)
-            state = ['schnorr', g, stm, W.__hash__()]
+            W = msm([g, stm], [r, c])
+            state = ['schnorr', g, stm, W]
             c2 = slef.challenge(state) % o
             return c == c2
 
@@ -88,15 +124,8 @@ class ZKP_Schnorr:
         return params
 
     def challenge(self, elements):
-        """Packages a challenge in a bijective way"""
-
-        elem = [len(elements)] + elements
-        elem_str = map(str, elem)
-        elem_len = map(lambda x: "%s||%s" % (len(x), x), elem_str)
-        state = "|".join(elem_len)
-        H = sha256()
-        H.update(state.encode("utf8"))
-        return Bn.from_binary(H.digest())
+        """Packages a challenge in a bijective way, see Transcript"""
+        return Transcript(b"ZKP_Schnorr").absorb(elements).challenge()
 
     def announce(self):
         (G, g, o) = self.params
@@ -117,6 +146,29 @@ class ZKP_Schnorr:
         right_side = (announce_element + challenge * stm)
         return left_side == right_side
 
+    def verify_equation(self, challenge, announce_element, stm, response):
+        """
+        Gives the equation checked by verify, response * g - W - challenge * stm = 0, so that it can be batched.
+
+        :return: a list of linear equations (points, scalars)
+        """
+        (G, g, o) = self.params
+        return [([g, announce_element, stm], [response, o - 1, o - challenge % o])]
+
+    def verify_batch(self, proofs):
+        """
+        Verifies many proofs with one MSM of a random linear combination of their equations, bisecting a failing
+        batch to find the invalid proofs.
+
+        :param proofs: a list of proofs, each the arguments of verify as a tuple
+        :return: a list of 0/1, one for each proof
+        """
+        o = self.G.order()
+        equations = [self.verify_equation(*proof) for proof in proofs]
+        verdicts = [False] * len(proofs)
+        verify_batch_bisect(equations, o, list(range(len(proofs))), verdicts)
+        return verdicts
+
 
 class Damgard_Transfor(ZKP_Schnorr):
     """
@@ -131,18 +183,49 @@ class Damgard_Transfor(ZKP_Schnorr):
         (pp_pedersen, trapdoor) = pedersen_setup(group)
         return pp_pedersen
 
-    def announce(self):
-        (G, g, o, h) = self.pp_pedersen
+    def announce(self, pp_pedersen=None):
+        """ :param pp_pedersen: the Pedersen parameters of the public parameters (pp_zkp), its own by default """
+        (G, g, o, h) = pp_pedersen = pp_pedersen if pp_pedersen is not None else self.pp_pedersen
         w_random = o.random()
         W_element = w_random * g
-        pedersen_commit, (r,m) = pedersen_committ(self.pp_pedersen, w_random)
+        pedersen_commit, (r,m) = pedersen_committ(pp_pedersen, w_random)
         pedersen_open = (r, m, W_element)
         return (pedersen_commit, pedersen_open)
 
-    def verify(self, challenge, pedersen_open, pedersen_commit, stm, response):
-        (G, g, o, h) = self.pp_pedersen
+    def verify(self, challenge, pedersen_open, pedersen_commit, stm, response, pp_pedersen=None):
+        """ :param pp_pedersen: the Pedersen parameters of the public parameters (pp_zkp), its own by default """
+        (G, g, o, h) = pp_pedersen = pp_pedersen if pp_pedersen is not None else self.pp_pedersen
         (open_randomness, announce_randomnes, announce_element) = pedersen_open
         pedersen_open = (open_randomness, announce_randomnes)
         left_side = response * g
         right_side = (announce_element + challenge * stm)
-        return left_side == right_side and pedersen_dec(self.pp_pedersen, pedersen_open, pedersen_commit)
+        return left_side == right_side and pedersen_dec(pp_pedersen, pedersen_open, pedersen_commit)
+
+    def verify_equation(self, challenge, pedersen_open, pedersen_commit, stm, response, pp_pedersen=None):
+        """
+        Gives the equations checked by verify, response * g - W - challenge * stm = 0 and the opening of the
+        Pedersen commitment r * h + w * g - pedersen_commit = 0, so that they can be batched.
+
+        :param pp_pedersen: the Pedersen parameters of the public parameters (pp_zkp), its own by default
+        :return: a list of linear equations (points, scalars)
+        """
+        (G, g, o, h) = pp_pedersen if pp_pedersen is not None else self.pp_pedersen
+        (open_randomness, announce_randomnes, announce_element) = pedersen_open
+        # a committed point instead of a Bn is added as is (see pedersen_dec)
+        (committed, m) = (g, announce_randomnes) if type(announce_randomnes) == Bn else (announce_randomnes, 1)
+        return [([g, announce_element, stm], [response, o - 1, o - challenge % o]),
+                ([h, committed, pedersen_commit], [open_randomness, m, o - 1])]
+
+    def verify_batch(self, proofs, pp_pedersen=None):
+        """
+        Verifies many proofs as ZKP_Schnorr.verify_batch.
+
+        :param proofs: a list of proofs, each the arguments of verify as a tuple
+        :param pp_pedersen: the Pedersen parameters of the public parameters (pp_zkp), its own by default
+        :return: a list of 0/1, one for each proof
+        """
+        o = self.G.order()
+        equations = [self.verify_equation(*proof, pp_pedersen=pp_pedersen) for proof in proofs]
+        verdicts = [False] * len(proofs)
+        verify_batch_bisect(equations, o, list(range(len(proofs))), verdicts)
+        return verdicts
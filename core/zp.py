@@ -0,0 +1,108 @@
+"""
+Vectors of scalars in Z_p, where p is the order of the bilinear groups. The scalars are kept as Python integers
+reduced modulo p, so vector operations do not allocate a Bn for every element and every intermediate result
+(see to_bn() where Bn are needed). Inverses of many scalars use Montgomery's batch inversion.
+"""
+
+from petlib.bn import Bn
+
+
+def to_bn(scalar):
+    """ convert a Python integer to Bn (a Bn is returned as is) """
+    if isinstance(scalar, Bn):
+        return scalar
+    bn = Bn.from_binary(abs(scalar).to_bytes((abs(scalar).bit_length() + 7) // 8 or 1, "big"))
+    return bn.int_neg() if scalar < 0 else bn
+
+
+def batch_inverse(values, order):
+    """
+    Inverts many scalars with a single modular inversion (Montgomery's trick), i.e., one inversion and about
+    3n multiplications instead of n inversions.
+
+    :param values: a list of non-zero scalars (Bn or int)
+    :param order: order of the field
+    :return: a list of the inverses as integers
+    """
+    o = int(order)
+    values = [int(v) % o for v in values]
+    prefix = []
+    acc = 1
+    for v in values:
+        if v == 0:
+            raise ZeroDivisionError("0 has no inverse")
+        prefix.append(acc)
+        acc = acc * v % o
+    inverse = pow(acc, -1, o)
+    ret = [0] * len(values)
+    for i in reversed(range(len(values))):
+        ret[i] = inverse * prefix[i] % o
+        inverse = inverse * values[i] % o
+    return ret
+
+
+class ZpVector(list):
+    """ a list of integers modulo order, with element-wise and vector operations modulo order """
+
+    def __init__(self, values, order):
+        """
+        :param values: scalars (Bn or int)
+        :param order: order of the field
+        """
+        self.order = int(order)
+        super().__init__(int(v) % self.order for v in values)
+
+    def _new(self, values):
+        ret = ZpVector([], self.order)
+        ret.extend(values)
+        return ret
+
+    def _check_length(self, other):
+        if len(other) != len(self):
+            raise ValueError("vectors of different lengths %d and %d" % (len(self), len(other)))
+
+    def add(self, other):
+        self._check_length(other)
+        return self._new((a + int(b)) % self.order for a, b in zip(self, other))
+
+    def sub(self, other):
+        self._check_length(other)
+        return self._new((a - int(b)) % self.order for a, b in zip(self, other))
+
+    def mul(self, other):
+        """ element-wise product """
+        self._check_length(other)
+        return self._new(a * int(b) % self.order for a, b in zip(self, other))
+
+    def scale(self, scalar):
+        s = int(scalar) % self.order
+        return self._new(a * s % self.order for a in self)
+
+    def inner(self, other):
+        """ inner product, as an integer """
+        self._check_length(other)
+        return sum(a * int(b) for a, b in zip(self, other)) % self.order
+
+    def inverse(self):
+        """ element-wise inverse, see batch_inverse """
+        return self._new(batch_inverse(self, self.order))
+
+    def to_bn(self):
+        """ :return: the elements as a list of Bn """
+        return [to_bn(a) for a in self]
+
+    @staticmethod
+    def combine(vectors, scalars, order):
+        """
+        Computes the linear combination sum_i scalars[i] * vectors[i], where shorter vectors are padded with zeros
+        (e.g. for polynomials of different degrees).
+
+        :return: a ZpVector of the length of the longest vector
+        """
+        o = int(order)
+        ret = [0] * max((len(vector) for vector in vectors), default=0)
+        for vector, scalar in zip(vectors, scalars):
+            s = int(scalar) % o
+            for k, a in enumerate(vector):
+                ret[k] += s * int(a)
+        return ZpVector(ret, o)
@@ -0,0 +1,30 @@
+"""
+This file contains unit tests for the timing and comparison helpers of the benchmarks: benchmarks/bench.py
+and a smoke test of a small run of all steps.
+"""
+
+from benchmarks.bench import measure, compare, percentile, run_benchmarks
+
+
+def test_measure():
+    stats = measure(lambda: sum(range(1000)), repeat=5)
+    assert stats["runs"] == 5
+    assert stats["min"] <= stats["p50"] <= stats["p90"] <= stats["max"]
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([1, 2, 3, 4], 99) == 4
+
+
+def test_compare():
+    baseline = [{"name": "sign", "params": {"t": 5}, "mean": 1.0}, {"name": "verify", "params": {"t": 5}, "mean": 1.0}]
+    results = [{"name": "sign", "params": {"t": 5}, "mean": 1.05}, {"name": "verify", "params": {"t": 5}, "mean": 1.5},
+               {"name": "verify", "params": {"t": 10}, "mean": 3.0}]
+    rows = compare(results, baseline, threshold=0.1)
+    assert [(name, regressed) for (name, params, base, mean, ratio, regressed) in rows] == [("sign", False), ("verify", True)]
+
+
+def test_run_benchmarks():
+    """a small run times every step, with sets of at most t - 1 messages"""
+    results = run_benchmarks([3], [1], [1], [1], repeat=1)
+    names = {result["name"] for result in results}
+    assert {"commit_set", "open_subset", "verify_cross", "sign", "change_rel", "issue_cred", "delegate_chain",
+            "proof_cred", "verify_proof"} <= names
+    assert all(result["runs"] == 1 and result["params"]["t"] == 3 for result in results)
@@ -4,6 +4,8 @@ This file contains unit tests for the functions in dac.py.
 It tests the functions with different inputs and verifies that they produce the expected outputs.
 """
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import core.dac
 from bplib.bp import BpGroup
 from core.dac import DAC
 from core.spseq_uc import EQC_Sign
@@ -87,6 +89,34 @@ def test_issuing() -> None:
     print("Issuing/delegating a credential of user U to a user R, and checking if the credential is correct")
 
 
+def test_issue_cred_batch() -> None:
+    """Test issuing many root credentials at once, where one proof of nym is invalid."""
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+    requests = []
+    for k_prime in [None, 3, None]:
+        (usk, upk) = dac.user_keygen(pp_dac)
+        (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk, upk)
+        requests.append(([message1_str, message2_str], nym_u, proof_nym_u, k_prime))
+    (challenge, pedersen_open, pedersen_commit, stm, response) = requests[2][2]
+    requests[2] = (requests[2][0], requests[2][1], (challenge, pedersen_open, pedersen_commit, stm, response + 1), None)
+
+    (creds, timing) = dac.issue_cred_batch(pp_dac, requests, sk_ca)
+    assert creds[2] is None and timing["issued"] == 2
+    (sigma, commitment_vector, opening_vector) = creds[0]
+    assert (spseq_uc.verify(pp_sign, vk_ca, requests[0][1], commitment_vector, sigma))
+    (sigma, update_key, commitment_vector, opening_vector) = creds[1]
+    assert (spseq_uc.verify(pp_sign, vk_ca, requests[1][1], commitment_vector, sigma))
+    ## the update key of a batch credential can extend it
+    (Sigma_tilde, C_L, O_L, commitment_vector_new, opening_vector_new) = spseq_uc.change_rel(pp_sign, ["Insurance = 2 "], 3, sigma, commitment_vector, opening_vector, update_key)
+    assert (spseq_uc.verify(pp_sign, vk_ca, requests[1][1], commitment_vector_new, Sigma_tilde))
+    ## a request with a k_prime that is not greater than the number of attributes sets gets no credential
+    requests[1] = requests[1][:3] + (2,)
+    (creds, timing) = dac.issue_cred_batch(pp_dac, requests, sk_ca)
+    assert creds[1] is None and creds[2] is None and creds[0] is not None and timing["issued"] == 1
+    print()
+    print("Issuing many root credentials at once")
+
+
 def test_proof_cred() -> None:
     """Test proving a credential to verifiers."""
     ## create user key pair
@@ -106,3 +136,82 @@ def test_proof_cred() -> None:
     assert (dac.verify_proof(pp_dac, proof, D)) , ValueError("the credential is not valid")
     print()
     print("proving a credential to verifiers, and checking if the proof is correct")
+
+
+def test_proof_cred_executor() -> None:
+    """Test computing the witness polynomials of a proof in worker processes."""
+    (usk, upk) = dac.user_keygen(pp_dac)
+    (nym_P, secret_nym_P, proof_nym_P) = dac.nym_gen(pp_dac, usk, upk)
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk = sk_ca, nym_u = nym_P, k_prime = None, proof_nym_u = proof_nym_P)
+    D = [SubList1_str, SubList2_str]
+    with ProcessPoolExecutor(2) as executor:
+        proof = dac.proof_cred(pp_dac, nym_R = nym_P, aux_R = secret_nym_P, cred_R = cred, Attr=Attr_vector, D = D, executor=executor)
+    assert (dac.verify_proof(pp_dac, proof, D)) , ValueError("the credential is not valid")
+    print()
+    print("proving a credential with witness polynomials computed in worker processes")
+
+
+def test_pedersen_parameters_of_pp_dac() -> None:
+    """Test that proofs of nym are created and checked with the Pedersen parameters of pp_dac, not of the object."""
+    other = DAC(t = 5, l_message = 10)
+    assert other.zkp.pp_pedersen[3] != pp_dac[1][3]
+    (usk, upk) = other.user_keygen(pp_dac)
+    (nym_P, secret_nym_P, proof_nym_P) = other.nym_gen(pp_dac, usk, upk)
+    assert dac.zkp.verify(*proof_nym_P, pp_pedersen=pp_dac[1]) and not other.zkp.verify(*proof_nym_P)
+    cred = other.issue_cred(pp_dac, attr_vector=Attr_vector, sk = sk_ca, nym_u = nym_P, k_prime = None, proof_nym_u = proof_nym_P)
+    D = [SubList1_str, SubList2_str]
+    proof = other.proof_cred(pp_dac, nym_R = nym_P, aux_R = secret_nym_P, cred_R = cred, Attr=Attr_vector, D = D)
+    assert other.verify_proof(pp_dac, proof, D) and dac.verify_proof(pp_dac, proof, D)
+    assert other.verify_proofs_batch(pp_dac, [proof], [D]) == [True]
+
+
+def test_proof_cred_empty_disclosure() -> None:
+    """Test proving a credential without disclosing any attribute, which the single and batch checks agree on."""
+    (usk, upk) = dac.user_keygen(pp_dac)
+    (nym_P, secret_nym_P, proof_nym_P) = dac.nym_gen(pp_dac, usk, upk)
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk = sk_ca, nym_u = nym_P, k_prime = None, proof_nym_u = proof_nym_P)
+    D = [[]]
+    proof = dac.proof_cred(pp_dac, nym_R = nym_P, aux_R = secret_nym_P, cred_R = cred, Attr=Attr_vector, D = D)
+    assert dac.verify_proof(pp_dac, proof, D)
+    assert dac.verify_proofs_batch(pp_dac, [proof], [D]) == [True]
+
+
+def test_verify_proofs_batch() -> None:
+    """Test verifying many proofs at once, where one of them is invalid."""
+    D = [SubList1_str, SubList2_str]
+    proofs = []
+    for _ in range(3):
+        (usk, upk) = dac.user_keygen(pp_dac)
+        (nym_P, secret_nym_P, proof_nym_P) = dac.nym_gen(pp_dac, usk, upk)
+        cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk = sk_ca, nym_u = nym_P, k_prime = None, proof_nym_u = proof_nym_P)
+        proofs.append(dac.proof_cred(pp_dac, nym_R = nym_P, aux_R = secret_nym_P, cred_R = cred, Attr=Attr_vector, D = D))
+
+    ## all proofs are valid
+    assert dac.verify_proofs_batch(pp_dac, proofs, [D, D, D]) == [True, True, True]
+
+    ## swap the aggregated witness of the second proof, the batch must point it out
+    (sigma_prime, rndmz_commitment_vector, nym_P, Witness_pi, proof_nym_p) = proofs[1]
+    proofs[1] = (sigma_prime, rndmz_commitment_vector, nym_P, proofs[0][3], proof_nym_p)
+    assert dac.verify_proofs_batch(pp_dac, proofs, [D, D, D]) == [True, False, True]
+    ## the verification key of the CA is prepared once
+    assert len(dac.prepared_vks) == 1
+    print()
+    print("verifying many proofs at once, and finding the invalid one")
+
+
+def test_prepared_vk_threads(monkeypatch) -> None:
+    """Test verifying proofs of two issuers from many threads, while their prepared keys are evicted."""
+    monkeypatch.setattr(core.dac, "MAX_PREPARED_VKS", 1)
+    verifier = DAC(t = 5, l_message = 10)
+    D = [SubList1_str, SubList2_str]
+    cases = []
+    for _ in range(2):
+        (pp_dac_i, proof_vk, vk_stm, sk_ca_i, proof_alpha, alpha_stm) = verifier.setup()
+        (usk, upk) = verifier.user_keygen(pp_dac_i)
+        (nym_P, secret_nym_P, proof_nym_P) = verifier.nym_gen(pp_dac_i, usk, upk)
+        cred = verifier.issue_cred(pp_dac_i, attr_vector=Attr_vector, sk = sk_ca_i, nym_u = nym_P, k_prime = None, proof_nym_u = proof_nym_P)
+        cases.append((pp_dac_i, verifier.proof_cred(pp_dac_i, nym_R = nym_P, aux_R = secret_nym_P, cred_R = cred, Attr=Attr_vector, D = D)))
+    verify = lambda i: verifier.verify_proof(cases[i % 2][0], cases[i % 2][1], D)
+    with ThreadPoolExecutor(8) as executor:
+        assert all(executor.map(verify, range(100)))
+    assert len(verifier.prepared_vks) == 1
@@ -0,0 +1,93 @@
+"""
+This is a Test (and example of how it works) of running the delegation protocol with asyncio: delegation.py
+This file contains unit tests for the functions in delegation.py.
+It tests a delegation over an in-memory transport, a rejected proof of nym and a session timeout.
+"""
+
+import asyncio
+import os
+import tempfile
+import pytest
+from core.dac import DAC
+from core.delegation import DelegationDriver, MemoryTransport, DONE, FAILED, _init_worker, _delegator_step
+from core.wire import encode, CRED, PROOF_NYM
+from core.storage import save_setup
+
+message1_str = ["age = 30", "name = Alice ", "driver license = 12"]
+message2_str = ["genther = male", "componey = XX ", "driver license type = B"]
+Attr_vector = [message1_str, message2_str]
+sub_mess_str = ["Insurance = 2 ", "Car type = BMW"]
+
+
+def setup_module(module):
+    print("__________Setup___Test delegation________")
+    global dac, setup, pp_dac, sk_ca, path
+    dac = DAC(t=5, l_message=10)
+    setup = dac.setup()
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = setup
+    path = os.path.join(tempfile.mkdtemp(), "pp_dac.bin")
+    save_setup(path, setup)
+
+
+def test_delegation():
+    """delegate a credential of user U to user R over an in-memory transport"""
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+    (usk_u, upk_u) = dac.user_keygen(pp_dac)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk_u, upk_u)
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=3, proof_nym_u=proof_nym_u)
+    (usk_R, upk_R) = dac.user_keygen(pp_dac)
+    (nym_R, secret_nym_R, proof_nym_R) = dac.nym_gen(pp_dac, usk_R, upk_R)
+
+    async def run():
+        with DelegationDriver(path, t=5, l_message=10, processes=2, timeout=60) as driver:
+            (end_u, end_R) = MemoryTransport.pair()
+            (session, (cred_R, A_l)) = await asyncio.gather(
+                driver.delegate(end_u, cred, sub_mess_str, 3, secret_nym_u),
+                driver.receive(end_R, nym_R, secret_nym_R, proof_nym_R))
+            assert session.state == DONE and len(driver.sessions) == 0
+            return cred_R, A_l
+
+    ((sigma_prime, rndmz_commitment_vector, rndmz_opening_vector, nym_P, chi), A_l) = asyncio.run(run())
+    assert A_l == sub_mess_str
+    assert dac.spseq_uc.verify(pp_sign, vk_ca, nym_P, rndmz_commitment_vector, sigma_prime)
+
+
+def test_rejected_and_timeout():
+    """a wrong proof of nym aborts both sides, and a session without an answer times out"""
+    (usk_u, upk_u) = dac.user_keygen(pp_dac)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk_u, upk_u)
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=3, proof_nym_u=proof_nym_u)
+    (challenge, pedersen_open, pedersen_commit, stm, response) = proof_nym_u
+    wrong_proof = (challenge, pedersen_open, pedersen_commit, stm, response + 1)
+
+    async def run():
+        with DelegationDriver(path, t=5, l_message=10, processes=1, timeout=60) as driver:
+            (end_u, end_R) = MemoryTransport.pair()
+            results = await asyncio.gather(driver.delegate(end_u, cred, sub_mess_str, 3, secret_nym_u),
+                                           driver.receive(end_R, nym_u, secret_nym_u, wrong_proof), return_exceptions=True)
+            assert all(isinstance(result, ValueError) for result in results)
+
+            driver.timeout = 0.1
+            (end_u, end_R) = MemoryTransport.pair()
+            with pytest.raises(asyncio.TimeoutError):
+                await driver.receive(end_R, nym_u, secret_nym_u, proof_nym_u)
+
+            ## the failed sessions are kept with their errors until they are collected
+            failed = driver.collect_failed()
+            assert [session.state for session in failed] == [FAILED] * 3 and len(driver.sessions) == 0
+            assert sorted(session.role for session in failed) == ["delegatee", "delegatee", "delegator"]
+            assert isinstance(failed[-1].error, asyncio.TimeoutError)
+
+    asyncio.run(run())
+
+
+def test_delegator_step_checks_nym():
+    """the worker checks the proof of nym itself, so a wrong proof is rejected even without asserts (python -O)"""
+    _init_worker(path, 5, 10)
+    (usk_u, upk_u) = dac.user_keygen(pp_dac)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk_u, upk_u)
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=3, proof_nym_u=proof_nym_u)
+    (challenge, pedersen_open, pedersen_commit, stm, response) = proof_nym_u
+    wrong_proof = (challenge, pedersen_open, pedersen_commit, stm, response + 1)
+    with pytest.raises(ValueError):
+        _delegator_step(encode(CRED, cred), sub_mess_str, 3, int(secret_nym_u), encode(PROOF_NYM, (nym_u, wrong_proof)))
@@ -0,0 +1,53 @@
+"""
+This is a Test (and example of how it works) of counting operations per high-level call: instrument.py
+This file contains unit tests for the functions in instrument.py.
+"""
+
+from core.dac import DAC
+from core.spseq_uc import EQC_Sign
+from core import instrument
+from core.instrument import instrumented, TOTAL
+from core.util import attribute_encoder, convert_mess_to_groups
+
+message1_str = ["age = 30", "name = Alice ", "driver license = 12"]
+message2_str = ["genther = male", "componey = XX ", "driver license type = B"]
+Attr_vector = [message1_str, message2_str]
+D = [["age = 30", "name = Alice "], ["genther = male", "componey = XX "]]
+
+
+def test_counters():
+    dac = DAC(t=5, l_message=10)
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = dac.setup()
+    (usk, upk) = dac.user_keygen(pp_dac)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk, upk)
+    original_sign = EQC_Sign.sign
+
+    with instrumented() as counters:
+        cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=None, proof_nym_u=proof_nym_u)
+        proof = dac.proof_cred(pp_dac, nym_R=nym_u, aux_R=secret_nym_u, cred_R=cred, Attr=Attr_vector, D=D)
+        assert dac.verify_proof(pp_dac, proof, D)
+    snapshot = counters.snapshot()
+
+    # everything is put back
+    assert EQC_Sign.sign is original_sign and not instrument.is_enabled()
+
+    assert snapshot["DAC.issue_cred"]["calls"] == 1
+    # the signature is counted to the sign call and to the enclosing issue_cred call
+    assert snapshot["EQC_Sign.sign"]["ops"]["msm"]["count"] >= 1
+    assert snapshot["DAC.issue_cred"]["ops"]["msm"]["count"] >= snapshot["EQC_Sign.sign"]["ops"]["msm"]["count"]
+    # commitments to 2 sets, each with a polynomial of its 3 attributes
+    assert snapshot["SetCommitment.commit_set"]["ops"]["poly_from_roots"]["count"] == 2
+    # verify_proof checks all pairing equations in multi-pairings
+    assert snapshot["DAC.verify_proof"]["ops"]["multi_pair"]["items"] >= 5
+    assert snapshot[TOTAL]["calls"] == 0 and "hashG1" not in snapshot[TOTAL]["ops"]
+
+    # hashes out of any high-level call are only counted to the total, cached attributes are not hashed again
+    attribute_encoder.clear()
+    with instrumented() as counters:
+        convert_mess_to_groups(message1_str + message1_str)
+    assert counters.snapshot()[TOTAL]["ops"]["hashG1"]["count"] == 3
+    snapshot = counters.snapshot()
+
+    # nothing is counted while disabled
+    dac.verify_proof(pp_dac, proof, D)
+    assert counters.snapshot() == snapshot
@@ -0,0 +1,58 @@
+"""
+This is a Test (and example of how it works) of issuing credentials in worker processes: issuer.py
+This file contains unit tests for the functions in issuer.py.
+It tests that credentials issued by the workers are correct, in order and as they are done.
+"""
+
+import os
+import tempfile
+from core.dac import DAC
+from core.issuer import Issuer
+from core.storage import save_setup
+
+message1_str = ["age = 30", "name = Alice ", "driver license = 12"]
+message2_str = ["genther = male", "componey = XX ", "driver license type = B"]
+Attr_vector = [message1_str, message2_str]
+
+
+def setup_module(module):
+    print("__________Setup___Test issuer________")
+    global dac, pp_dac, path
+    dac = DAC(t=5, l_message=10)
+    setup = dac.setup()
+    pp_dac = setup[0]
+    path = os.path.join(tempfile.mkdtemp(), "pp_dac.bin")
+    save_setup(path, setup, include_secret_key=True)
+
+
+def make_requests(n):
+    requests = []
+    for i in range(n):
+        (usk, upk) = dac.user_keygen(pp_dac)
+        (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk, upk)
+        requests.append((Attr_vector, nym_u, proof_nym_u, 3 if i % 2 else None))
+    return requests
+
+
+def test_issue():
+    """issue credentials in order and as they are done, and check a request with an invalid proof of nym"""
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+    requests = make_requests(6)
+    # a proof of nym with a wrong response is not valid
+    (challenge, pedersen_open, pedersen_commit, stm, response) = requests[0][2]
+    requests.append((Attr_vector, requests[0][1], (challenge, pedersen_open, pedersen_commit, stm, response + 1)))
+
+    with Issuer(path, t=5, l_message=10, processes=2, max_pending=3) as issuer:
+        creds = list(issuer.issue(requests))
+        assert [index for (index, cred) in creds] == list(range(len(requests)))
+        for (index, cred) in creds[:-1]:
+            (sigma, commitment_vector) = (cred[0], cred[-2])
+            assert len(cred) == (4 if index % 2 else 3)
+            assert dac.spseq_uc.verify(pp_sign, vk_ca, requests[index][1], commitment_vector, sigma)
+        assert creds[-1][1] is None
+
+        unordered = list(issuer.issue(requests[:4], ordered=False))
+        assert sorted(index for (index, cred) in unordered) == [0, 1, 2, 3]
+
+        stats = issuer.stats()
+        assert sum(s["requests"] for s in stats.values()) == len(requests) + 4
@@ -0,0 +1,63 @@
+"""
+This is a Test (and example of how it works) of verifying a stream of encoded proofs: pipeline.py
+This file contains unit tests for the functions in pipeline.py.
+It tests that valid, invalid and malformed proofs get the right verdicts in the order of the stream.
+"""
+
+import pytest
+from core.dac import DAC
+from core.pipeline import verify_stream
+from core.wire import encode, PROOF, CRED
+
+message1_str = ["age = 30", "name = Alice ", "driver license = 12"]
+message2_str = ["genther = male", "componey = XX ", "driver license type = B"]
+Attr_vector = [message1_str, message2_str]
+D = [["age = 30", "name = Alice "], ["genther = male", "componey = XX "]]
+
+
+def setup_module(module):
+    print("__________Setup___Test pipeline________")
+    global dac, pp_dac, sk_ca
+    dac = DAC(t=5, l_message=10)
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = dac.setup()
+
+
+def make_proof():
+    (usk, upk) = dac.user_keygen(pp_dac)
+    (nym_P, secret_nym_P, proof_nym_P) = dac.nym_gen(pp_dac, usk, upk)
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_P, k_prime=None, proof_nym_u=proof_nym_P)
+    return cred, dac.proof_cred(pp_dac, nym_R=nym_P, aux_R=secret_nym_P, cred_R=cred, Attr=Attr_vector, D=D)
+
+
+def test_verify_stream():
+    (cred, proof) = make_proof()
+    (cred2, proof2) = make_proof()
+    (sigma_prime, rndmz_commitment_vector, nym_P, Witness_pi, proof_nym_p) = proof2
+    # a proof with a wrong aggregated witness passes the nym check but fails the pairings
+    wrong_witness = (sigma_prime, rndmz_commitment_vector, nym_P, proof[3], proof_nym_p)
+    # a proof with a wrong nym proof is rejected before the pairings
+    (challenge, pedersen_open, pedersen_commit, nym, response) = proof_nym_p
+    wrong_nym = (sigma_prime, rndmz_commitment_vector, nym_P, Witness_pi, (challenge, pedersen_open, pedersen_commit, nym, response + 1))
+
+    items = [("a", encode(PROOF, proof)), ("b", b"garbage"), ("c", encode(PROOF, wrong_witness)),
+             ("d", encode(PROOF, proof2)), ("e", encode(CRED, cred)), ("f", encode(PROOF, wrong_nym)),
+             ("g", encode(PROOF, proof2), [D[0]])]
+    # a D with more than t - 1 attributes, and a proof with more commitments than the key of the CA, are rejected
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+    too_many_commitments = (sigma_prime, rndmz_commitment_vector * len(vk_ca), nym_P, Witness_pi, proof_nym_p)
+    items += [("h", encode(PROOF, proof2), [message1_str, message2_str]), ("i", encode(PROOF, too_many_commitments)),
+              ("j", encode(PROOF, proof2))]
+    verdicts = list(verify_stream(dac, pp_dac, iter(items), D=D, batch_size=3))
+    assert verdicts == [("a", True), ("b", False), ("c", False), ("d", True), ("e", False), ("f", False), ("g", False),
+                        ("h", False), ("i", False), ("j", True)]
+    with pytest.raises(ValueError):
+        verify_stream(dac, pp_dac, items, D=[message1_str, message2_str])
+
+
+def test_verify_stream_without_D():
+    """an item without D (and no D for the stream) is rejected alone, and a malformed D of the stream is an error"""
+    (cred, proof) = make_proof()
+    items = [("a", encode(PROOF, proof)), ("b", encode(PROOF, proof), D), ("c", encode(PROOF, proof), "age = 30")]
+    assert list(verify_stream(dac, pp_dac, items)) == [("a", False), ("b", True), ("c", False)]
+    with pytest.raises(ValueError):
+        verify_stream(dac, pp_dac, items, D="age = 30")
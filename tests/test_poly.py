@@ -0,0 +1,62 @@
+"""
+This is a Test (and example of how it works) of polynomial arithmetic over Z_p: poly.py
+This file contains unit tests for the functions in poly.py.
+It tests the functions with different inputs and verifies that they produce the expected outputs.
+"""
+
+import random
+from core.poly import poly_from_roots, poly_mul, poly_divmod, poly_eval, poly_scale, subproduct_tree, subproduct_cofactors
+
+## order of the BN254 groups used by bplib
+order = 16798108731015832284940804142231733909759579603404752749028378864165570215949
+roots = [random.randrange(order) for _ in range(9)]
+
+
+def test_poly_from_roots():
+    coeff = poly_from_roots(roots, order)
+    # monic, of the right degree, reduced and vanishing exactly on the roots
+    assert len(coeff) == len(roots) + 1 and coeff[-1] == 1
+    assert all(0 <= c < order for c in coeff)
+    assert all(poly_eval(coeff, r, order) == 0 for r in roots)
+    assert poly_eval(coeff, roots[0] + 1, order) != 0
+    assert poly_from_roots([], order) == [1]
+    # same polynomial as multiplying (x - r) one root at a time
+    naive = [1]
+    for r in roots:
+        naive = poly_mul(naive, [-r % order, 1], order)
+    assert coeff == naive
+
+
+def test_subproduct_tree():
+    tree = subproduct_tree(roots, order)
+    assert len(tree[0]) == len(roots) and len(tree[-1]) == 1
+    assert tree[-1][0] == poly_from_roots(roots, order)
+
+
+def test_subproduct_cofactors():
+    # the cofactor of each root is the product of the other roots, for an odd and an even number of roots
+    for rs in (roots, roots[:8], roots[:1]):
+        cofactors = subproduct_cofactors(subproduct_tree(rs, order), order)
+        assert cofactors == [poly_from_roots(rs[:i] + rs[i + 1:], order) for i in range(len(rs))]
+    assert subproduct_cofactors(subproduct_tree([], order), order) == []
+
+
+def test_poly_divmod():
+    coeff = poly_from_roots(roots, order)
+    # dividing by a factor leaves no remainder and gives the polynomial of the other roots
+    quotient, remainder = poly_divmod(coeff, poly_from_roots(roots[:4], order), order)
+    assert remainder == [0]
+    assert quotient == poly_from_roots(roots[4:], order)
+    # a random division satisfies a = q * b + r
+    a = [random.randrange(order) for _ in range(7)]
+    b = [random.randrange(order) for _ in range(3)]
+    quotient, remainder = poly_divmod(a, b, order)
+    recomposed = poly_mul(quotient, b, order)
+    recomposed = [(recomposed[i] + (remainder[i] if i < len(remainder) else 0)) % order for i in range(len(recomposed))]
+    assert recomposed == a and len(remainder) < len(b)
+
+
+def test_poly_scale():
+    coeff = poly_from_roots(roots, order)
+    x, s = random.randrange(order), random.randrange(order)
+    assert poly_eval(poly_scale(coeff, s, order), x, order) == (s * poly_eval(coeff, x, order)) % order
@@ -0,0 +1,54 @@
+"""
+This is a Test (and example of how it works) of the randomizer pool of proofs of credentials: randomizer.py
+This file contains unit tests for the functions in randomizer.py.
+It tests that proofs made with precomputed randomness verify and that every entry is used once.
+"""
+
+from core.dac import DAC
+from core.randomizer import RandomizerPool
+import pytest
+import time
+
+message1_str = ["age = 30", "name = Alice ", "driver license = 12"]
+message2_str = ["genther = male", "componey = XX ", "driver license type = B"]
+Attr_vector = [message1_str, message2_str]
+D = [["age = 30", "name = Alice "], ["genther = male", "componey = XX "]]
+
+
+def setup_module(module):
+    print("__________Setup___Test randomizer pool________")
+    global dac, pp_dac, cred, nym_u, secret_nym_u
+    dac = DAC(t=5, l_message=10)
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = dac.setup()
+    (usk, upk) = dac.user_keygen(pp_dac)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk, upk)
+    cred = dac.issue_cred(pp_dac, Attr_vector, sk_ca, nym_u, None, proof_nym_u)
+
+
+def test_proof_cred_pool():
+    """proofs made with entries of the pool (and with an empty pool) are valid and unlinkable"""
+    pool = RandomizerPool(dac, pp_dac, size=2, background=False)
+    pool.fill()
+    assert len(pool) == 2
+    proofs = [dac.proof_cred(pp_dac, nym_u, secret_nym_u, cred, Attr_vector, D, pool=pool) for _ in range(3)]
+    assert len(pool) == 0 and pool.misses == 1
+    for proof in proofs:
+        assert dac.verify_proof(pp_dac, proof, D)
+    assert proofs[0][2] != proofs[1][2] and proofs[1][2] != proofs[2][2]
+
+
+def test_background_pool():
+    """the background thread fills the pool up to its size"""
+    with RandomizerPool(dac, pp_dac, size=3) as pool:
+        while len(pool) < 3:
+            time.sleep(0.01)
+        proof = dac.proof_cred(pp_dac, nym_u, secret_nym_u, cred, Attr_vector, D, pool=pool)
+    assert dac.verify_proof(pp_dac, proof, D) and pool.misses == 0
+
+
+def test_pool_of_other_issuer():
+    other_dac = DAC(t=5, l_message=10)
+    (other_pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = other_dac.setup()
+    pool = RandomizerPool(other_dac, other_pp_dac, size=1, background=False)
+    with pytest.raises(ValueError):
+        dac.proof_cred(pp_dac, nym_u, secret_nym_u, cred, Attr_vector, D, pool=pool)
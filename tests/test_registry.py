@@ -0,0 +1,64 @@
+"""
+This is a Test (and example of how it works) of hosting several credential schemas in one process: registry.py
+This file contains unit tests for the functions in registry.py and context.py.
+It tests that schemas with different max cardinality do not change each other and can share a setup.
+"""
+
+import os
+import tempfile
+import pytest
+from core.context import Context, shared_group
+from core.dac import DAC
+from core.registry import Registry
+from core.storage import save_setup
+
+message1_str = ["age = 30", "name = Alice "]
+message2_str = ["genther = male", "componey = XX "]
+Attr_vector = [message1_str, message2_str]
+D = [["age = 30"], ["genther = male"]]
+
+
+def issue_and_prove(dac, setup, k_prime=None):
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = setup
+    (usk, upk) = dac.user_keygen(pp_dac)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk, upk)
+    cred = dac.issue_cred(pp_dac, Attr_vector, sk_ca, nym_u, k_prime, proof_nym_u)
+    if k_prime is not None:
+        return cred
+    proof = dac.proof_cred(pp_dac, nym_u, secret_nym_u, cred, Attr_vector, D)
+    return dac.verify_proof(pp_dac, proof, D)
+
+
+def test_schemas_do_not_share_parameters():
+    """a DAC object created later with another t does not change an earlier one"""
+    small = DAC(t=3, l_message=6)
+    small_setup = small.setup()
+    large = DAC(t=7, l_message=6)
+    large_setup = large.setup()
+    assert small.context.max_cardinality == 3 and large.context.max_cardinality == 7
+    assert small.context.group is large.context.group is shared_group()
+
+    (sigma, update_key, commitment_vector, opening_vector) = issue_and_prove(small, small_setup, k_prime=3)
+    assert update_key.cardinality == 3 and len(small_setup[0][0][1]) == 3
+    assert issue_and_prove(small, small_setup) and issue_and_prove(large, large_setup)
+
+
+def test_registry():
+    """schemas of a registry share a setup file, which is loaded once"""
+    path = os.path.join(tempfile.mkdtemp(), "pp_dac.bin")
+    save_setup(path, DAC(t=5, l_message=6).setup(), include_secret_key=True)
+
+    registry = Registry()
+    (id_card, id_setup) = registry.add("id-card", t=5, l_message=6, setup=path)
+    (ticket, ticket_setup) = registry.add("ticket", t=3, l_message=4, setup=path)
+    assert ticket_setup is id_setup and len(registry.setups) == 1
+    assert registry.names() == ["id-card", "ticket"] and "ticket" in registry
+    assert issue_and_prove(id_card, id_setup) and issue_and_prove(ticket, ticket_setup)
+
+    with pytest.raises(ValueError):
+        registry.add("ticket", t=3, l_message=4, setup=path)
+    with pytest.raises(ValueError):
+        registry.add("large", t=6, l_message=4, setup=path)
+    registry.remove("ticket")
+    assert len(registry) == 1 and registry.get("id-card")[0] is id_card
+    assert repr(Context(3)).startswith("Context(max_cardinality=3")
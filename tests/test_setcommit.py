@@ -4,7 +4,10 @@ This file contains unit tests for the functions in set_commit.py
 It tests the functions with different inputs and verifies that they produce the expected outputs.
 """
 
-from core.set_commit import SetCommitment, CrossSetCommitment
+from concurrent.futures import ThreadPoolExecutor
+import core.set_commit
+from core.set_commit import SetCommitment, CrossSetCommitment, witness_polynomial
+from core.util import table_size, attribute_encoder, convert_mess_to_groups
 
 ## messagses
 set_str = ["age = 30", "name = Alice ", "driver license = 12"]
@@ -37,6 +40,32 @@ def test_open_verify_subset():
     # check if subset is match with witness and commitment
     assert sc_scheme.verify_subset(pp, commitment, subset_str_1, witness), "subset is not match with witness"
 
+def test_open_subsets():
+    # create set commitment and opening for message set:  set_str
+    (commitment, O) = sc_scheme.commit_set(param_sc=pp, mess_set_str=set_str)
+    # create witnesses for many subsets at once, and for all singletons
+    subsets = [subset_str_1, ["driver license = 12"], set_str]
+    witnesses = sc_scheme.open_subsets(pp, set_str, O, subsets)
+    singleton_witnesses = sc_scheme.open_subsets(pp, set_str, O)
+    assert all(sc_scheme.verify_subset(pp, commitment, subsets[i], witnesses[i]) for i in range(len(subsets)))
+    assert all(sc_scheme.verify_subset(pp, commitment, [set_str[i]], singleton_witnesses[i]) for i in range(len(set_str)))
+    # a witness is the same as one created by open_subset
+    assert witnesses[0] == sc_scheme.open_subset(pp, set_str, O, subset_str_1)
+    # a set which is not a subset gets no witness
+    assert sc_scheme.open_subsets(pp, set_str, O, [subset_str_2]) == [False]
+    # a singleton witness is the same as one created by open_subset
+    assert singleton_witnesses[1] == sc_scheme.open_subset(pp, set_str, O, [set_str[1]])
+    # an empty set has no singletons, and only the empty subset has a witness
+    (empty_commitment, empty_O) = sc_scheme.commit_set(pp, [])
+    assert sc_scheme.open_subsets(pp, [], empty_O) == []
+    (witness, not_witness) = sc_scheme.open_subsets(pp, [], empty_O, [[], subset_str_1])
+    assert witness == empty_commitment and not_witness is False
+    # the pairs of this check are (W, P_hat) and (-C, P_hat), so it only holds as the pairing product cancels
+    assert sc_scheme.verify_subset(pp, empty_commitment, [], witness)
+    assert not sc_scheme.verify_subset(pp, empty_commitment, [], witness + witness)
+    # the empty subset of any set, whose witness is the commitment itself
+    assert sc_scheme.verify_subset(pp, commitment, [], sc_scheme.open_subsets(pp, set_str, O, [[]])[0])
+
 def test_aggregate_verify_cross():
     """check aggregation of witnesses using cross set commitment scheme"""
     # create two set commitments for two sets set_str and set_str2
@@ -53,3 +82,111 @@ def test_aggregate_verify_cross():
     ## verification aggregated witnesses
     assert( cssc_scheme.verify_cross(pp, commit_vector=[C1, C2],
                                   subsets_vector_str=[subset_str_1, subset_str_2], proof=proof)), ValueError("verification aggegated witnesses fails")
+
+def test_reject_wrong_witness():
+    """check that verify_subset and verify_cross reject a witness or a proof for other subsets"""
+    C1, O1 = cssc_scheme.commit_set(pp, set_str)
+    C2, O2 = cssc_scheme.commit_set(pp, set_str2)
+    W1 = cssc_scheme.open_subset(pp, set_str, O1, subset_str_1)
+    W2 = cssc_scheme.open_subset(pp, set_str2, O2, subset_str_2)
+    assert not cssc_scheme.verify_subset(pp, C1, subset_str_1[:1], W1)
+    assert not cssc_scheme.verify_subset(pp, C2, subset_str_1, W1)
+    proof = cssc_scheme.aggregate_cross([W1, W2], [C1, C2])
+    assert not cssc_scheme.verify_cross(pp, [C2, C1], [subset_str_1, subset_str_2], proof)
+    assert not cssc_scheme.verify_cross(pp, [C1, C2], [subset_str_1, subset_str_2], W1)
+
+def test_aggregate_polynomials():
+    """check that the aggregate witness from the witness polynomials is the aggregate of the witnesses"""
+    (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp
+    C1, O1 = cssc_scheme.commit_set(pp, set_str)
+    C2, O2 = cssc_scheme.commit_set(pp, set_str2)
+    W1 = cssc_scheme.open_subset(pp, set_str, O1, subset_str_1)
+    W2 = cssc_scheme.open_subset(pp, set_str2, O2, subset_str_2)
+    coeffs = [witness_polynomial(set_str, subset_str_1, order), witness_polynomial(set_str2, subset_str_2, order)]
+    proof = cssc_scheme.aggregate_polynomials(pp, coeffs, [O1, O2], [C1, C2])
+    assert proof == cssc_scheme.aggregate_cross([W1, W2], [C1, C2])
+    assert witness_polynomial(set_str, subset_str_2, order) is None
+
+    ## the same proof from the sets, with or without their commitments
+    assert cssc_scheme.open_and_aggregate(pp, [set_str, set_str2], [O1, O2], [subset_str_1, subset_str_2], [C1, C2]) == proof
+    assert cssc_scheme.open_and_aggregate(pp, [set_str, set_str2], [O1, O2], [subset_str_1, subset_str_2]) == proof
+
+def test_prepared_policy():
+    """check that the G2 points of a disclosure policy are computed once and reused for other proofs"""
+    scheme = CrossSetCommitment(5)
+    C1, O1 = scheme.commit_set(pp, set_str)
+    C2, O2 = scheme.commit_set(pp, set_str2)
+    proof = scheme.aggregate_cross([scheme.open_subset(pp, set_str, O1, subset_str_1),
+                                    scheme.open_subset(pp, set_str2, O2, subset_str_2)], [C1, C2])
+    assert scheme.verify_cross(pp, [C1, C2], [subset_str_1, subset_str_2], proof)
+
+    ## the same policy with the messages of a subset in another order uses the prepared points
+    assert scheme.verify_cross(pp, [C1, C2], [subset_str_1[::-1], subset_str_2], proof)
+    assert len(scheme.prepared_policies) == 1
+
+    ## another policy is prepared separately, and the proof is not valid for it
+    assert not scheme.verify_cross(pp, [C1, C2], [subset_str_1[:1], subset_str_2], proof)
+    assert len(scheme.prepared_policies) == 2
+
+    ## parameters that share only their last G2 base get another key
+    (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp
+    other_pp = (pp_commit_G2[:1] + [order.random() * g_2 for _ in pp_commit_G2[1:-1]] + pp_commit_G2[-1:], pp_commit_G1, g_1, g_2, order, group)
+    assert CrossSetCommitment.policy_key(other_pp, [subset_str_1]) != CrossSetCommitment.policy_key(pp, [subset_str_1])
+    ## the fingerprint of the G2 bases is computed once per parameters
+    assert len(scheme.param_fingerprints) == 1
+    assert scheme.fingerprint(pp) == CrossSetCommitment.param_fingerprint(pp)
+    assert scheme.fingerprint(other_pp) != scheme.fingerprint(pp) and len(scheme.param_fingerprints) == 2
+
+def test_prepared_policy_threads(monkeypatch):
+    """check that verifications from many threads share the prepared policies while they are evicted"""
+    monkeypatch.setattr(core.set_commit, "MAX_PREPARED_POLICIES", 2)
+    scheme = CrossSetCommitment(5)
+    C1, O1 = scheme.commit_set(pp, set_str)
+    policies = [[subset] for subset in (set_str, set_str[:1], set_str[1:], set_str[:2], set_str[::2])]
+    proofs = [scheme.open_subset(pp, set_str, O1, policy[0]) for policy in policies]
+    verify = lambda i: scheme.verify_cross(pp, [C1], policies[i % 5], scheme.aggregate_cross([proofs[i % 5]], [C1]))
+    with ThreadPoolExecutor(8) as executor:
+        assert all(executor.map(verify, range(200)))
+    assert len(scheme.prepared_policies) <= 2
+
+def test_cross_challenges():
+    """check that the cross challenges of commitments are computed once and reused by aggregation and verification"""
+    scheme = CrossSetCommitment(5)
+    C1, O1 = scheme.commit_set(pp, set_str)
+    C2, O2 = scheme.commit_set(pp, set_str2)
+    proof = scheme.aggregate_cross([scheme.open_subset(pp, set_str, O1, subset_str_1),
+                                    scheme.open_subset(pp, set_str2, O2, subset_str_2)], [C1, C2])
+    assert len(scheme.cross_challenges) == 2
+    assert scheme.verify_cross(pp, [C1, C2], [subset_str_1, subset_str_2], proof)
+    assert len(scheme.cross_challenges) == 2
+    assert scheme.challenges([C2]) == [CrossSetCommitment.cross_challenge(C2)]
+    ## a copy of a commitment (e.g. decoded from the wire) uses the cached challenge
+    (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp
+    C1_copy = type(C1).from_bytes(C1.export(), group)
+    assert scheme.challenges([C1_copy]) == scheme.challenges([C1]) and len(scheme.cross_challenges) == 2
+
+def test_fixed_base_tables():
+    """check that precomputed tables fit the budget and give the same commitments"""
+    pp_tables, alpha = sc_scheme.setup(table_budget=2 ** 20)
+    (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_tables
+    assert 0 < table_size(pp_tables)["bytes"] <= 2 ** 20
+    # multiplication with a table is the same as the plain one
+    x = order.random()
+    assert pp_commit_G1.tables[1].mul(x) == pp_commit_G1[1].mul(x)
+    assert pp_commit_G2.tables[0].mul(x) == g_2.mul(x)
+    # commit and open using the parameters with tables
+    (commitment, O) = sc_scheme.commit_set(param_sc=pp_tables, mess_set_str=set_str)
+    witness = sc_scheme.open_subset(pp_tables, set_str, O, subset_str_1)
+    assert sc_scheme.verify_subset(pp_tables, commitment, subset_str_1, witness), "subset is not match with witness"
+
+def test_attribute_encoder():
+    """check that encodings of repeated attributes come from the cache"""
+    attribute_encoder.clear()
+    cssc_scheme.commit_set(pp, set_str)
+    assert attribute_encoder.stats()["misses"] == len(set_str)
+    # committing to the same set again only hits the cache
+    cssc_scheme.commit_set(pp, set_str)
+    assert attribute_encoder.stats()["hits"] == len(set_str) and attribute_encoder.stats()["misses"] == len(set_str)
+    # hashing into G1 is cached separately and gives the same points
+    assert convert_mess_to_groups(set_str) == convert_mess_to_groups(set_str)
+    assert attribute_encoder.stats()["size"] == 2 * len(set_str)
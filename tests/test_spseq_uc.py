@@ -4,7 +4,7 @@ This file contains unit tests for the functions in spseq_uc.py.
 It tests the functions with different inputs and verifies that they produce the expected outputs.
 """
 
-from core.spseq_uc import EQC_Sign
+from core.spseq_uc import EQC_Sign, PreparedVerificationKey
 
 message1_str = ["age = 30", "name = Alice ", "driver license = 12"]
 message2_str = ["genther = male", "componey = XX ", "driver license type = B"]
@@ -152,3 +152,60 @@ def test_convert():
     assert(sign_scheme.verify(pp, vk, PK_u_new, commitment_vector, sigma_new))
     print()
     print("run convert protocol (send_convert_sig, receive_convert_sig) to switch a pk_u to new pk_u and verify the new signature for new pk_u it")
+
+def test_prepared_vk():
+    """verify signatures with a prepared verification key, and reject a signature for another user"""
+    (sk, vk) = sign_scheme.sign_keygen(pp_sign=pp, l_message=10)
+    (sk_u, pk_u) = sign_scheme.user_keygen(pp)
+    (sk_other, pk_other) = sign_scheme.user_keygen(pp)
+    (sigma, commitment_vector, opening_vector) = sign_scheme.sign(pp, pk_u, sk, messages_vector=[message1_str, message2_str])
+
+    prepared_vk = PreparedVerificationKey(pp, vk)
+    assert prepared_vk.verify(pk_u, commitment_vector, sigma)
+    assert not prepared_vk.verify(pk_other, commitment_vector, sigma)
+    assert not prepared_vk.verify(pk_u, commitment_vector[::-1], sigma)
+    print()
+    print("verify signatures with a prepared verification key")
+
+def test_sign_batch():
+    """Generate signatures for many users at once, with and without update keys, and verify them"""
+    (sk, vk) = sign_scheme.sign_keygen(pp_sign=pp, l_message=10)
+    users = [sign_scheme.user_keygen(pp) for _ in range(3)]
+    requests = [(users[0][1], [message1_str, message2_str]), (users[1][1], [message1_str, message2_str], 3),
+                (users[2][1], [message3_str])]
+
+    (results, timing) = sign_scheme.sign_batch(pp, requests, sk)
+    assert timing["count"] == 3
+    (sigma, commitment_vector, opening_vector) = results[0]
+    assert sign_scheme.verify(pp, vk, users[0][1], commitment_vector, sigma)
+    (sigma, update_key, commitment_vector, opening_vector) = results[1]
+    assert sign_scheme.verify(pp, vk, users[1][1], commitment_vector, sigma)
+    (Sigma_tilde, C_L, O_L, commitment_vector_new, opening_vector_new) = sign_scheme.change_rel(pp, message3_str, 3, sigma, commitment_vector, opening_vector, update_key)
+    assert sign_scheme.verify(pp, vk, users[1][1], commitment_vector_new, Sigma_tilde)
+    (sigma, commitment_vector, opening_vector) = results[2]
+    assert sign_scheme.verify(pp, vk, users[2][1], commitment_vector, sigma)
+    ## a k_prime that is not greater than the message length gives no signature, as in sign, and not for the others
+    (results, timing) = sign_scheme.sign_batch(pp, [(users[0][1], [message1_str, message2_str], 2), requests[2]], sk)
+    assert results[0] is None and sign_scheme.sign(pp, users[0][1], sk, [message1_str, message2_str], k_prime=2) is None
+    assert sign_scheme.verify(pp, vk, users[2][1], results[1][1], results[1][0])
+    print()
+    print("Generate signatures for many users at once and verify them")
+
+def test_update_key_lazy():
+    """randomizing an update key only changes its factor, which is applied when change_rel uses an index"""
+    (sk, vk) = sign_scheme.sign_keygen(pp_sign=pp, l_message=10)
+    (sk_u, pk_u) = sign_scheme.user_keygen(pp)
+    (sigma, update_key, commitment_vector, opening_vector) = sign_scheme.sign(pp, pk_u, sk, messages_vector=[message1_str], k_prime=3)
+    assert list(update_key) == [2, 3] and len(update_key.points) == 2 * 5
+
+    (mu, psi) = (pp[4].random(), pp[4].random())
+    (sigma_prime, rndmz_update_key, rndmz_commitment_vector, rndmz_opening_vector, rndmz_pk_u, chi) = sign_scheme.change_rep(pp, vk, pk_u, commitment_vector, opening_vector, sigma, mu, psi, B=True, update_key=update_key)
+    assert rndmz_update_key.points is update_key.points
+    ## the points of the randomized key are the points of the key times mu / psi
+    assert rndmz_update_key[3] == [mu.mod_mul(psi.mod_inverse(pp[4]), pp[4]) * point for point in update_key[3]]
+    assert rndmz_update_key.apply() == rndmz_update_key
+
+    (Sigma_tilde, C_L, O_L, commitment_vector_new, opening_vector_new) = sign_scheme.change_rel(pp, message2_str, 2, sigma_prime, rndmz_commitment_vector, rndmz_opening_vector, rndmz_update_key, mu)
+    assert sign_scheme.verify(pp, vk, rndmz_pk_u, commitment_vector_new, Sigma_tilde)
+    print()
+    print("randomize an update key lazily and use it in changerel")
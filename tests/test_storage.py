@@ -0,0 +1,51 @@
+"""
+This is a Test (and example of how it works) of saving and loading the DAC public parameters: storage.py
+This file contains unit tests for the functions in storage.py.
+It tests that loaded parameters (with memory-mapped tables) work as the generated ones.
+"""
+
+import os
+import tempfile
+from core.dac import DAC
+from core.storage import save_setup, load_setup
+from core.util import table_size
+
+message1_str = ["age = 30", "name = Alice ", "driver license = 12"]
+message2_str = ["genther = male", "componey = XX ", "driver license type = B"]
+Attr_vector = [message1_str, message2_str]
+D = [["age = 30", "name = Alice "], ["genther = male", "componey = XX "]]
+
+
+def setup_module(module):
+    print("__________Setup___Test storage________")
+    global dac, setup, path
+    dac = DAC(t=5, l_message=10, table_budget=2 ** 20)
+    setup = dac.setup()
+    path = os.path.join(tempfile.mkdtemp(), "pp_dac.bin")
+
+
+def test_save_load():
+    """save parameters with the secret key and tables, load them and issue, prove and verify with them"""
+    save_setup(path, setup, include_secret_key=True)
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = load_setup(path)
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_dac
+    assert vk_ca == setup[0][3] and sk_ca == setup[3]
+    assert vk_stm == setup[2] and proof_vk == setup[1] and alpha_stm == setup[5]
+    assert dac.nizkp.non_interact_verify(pp_nizkp, vk_stm, proof_vk)
+
+    # tables are loaded from the file and give the same results
+    assert table_size(pp_sign) == table_size(setup[0][0])
+    (pp_commit_G2, pp_commit_G1, g_1, g_2, order, group) = pp_sign
+    x = order.random()
+    assert pp_commit_G1.tables[2].mul(x) == setup[0][0][1][2].mul(x)
+
+    (usk, upk) = dac.user_keygen(pp_dac)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk, upk)
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=None, proof_nym_u=proof_nym_u)
+    proof = dac.proof_cred(pp_dac, nym_R=nym_u, aux_R=secret_nym_u, cred_R=cred, Attr=Attr_vector, D=D)
+    assert dac.verify_proof(pp_dac, proof, D)
+
+
+def test_without_secret_key():
+    save_setup(path, setup)
+    assert load_setup(path)[3] is None
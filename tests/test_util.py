@@ -0,0 +1,89 @@
+"""
+This is a Test (and example of how it works) of the group utilities: util.py
+This file contains unit tests for the multi-pairings, pairing checks and multi-scalar multiplications in util.py.
+It tests them against the pairings and scalar multiplications of the underlying library one at a time.
+"""
+
+import pytest
+from bplib.bp import BpGroup, G1Elem, G2Elem, GTElem
+import core.util
+from core.util import multi_pair, pairing_check, msm
+from core.set_commit import SetCommitment
+
+
+def setup_module(module):
+    print("__________Setup___Test util________")
+    global group, g_1, g_2, order
+    group = BpGroup()
+    (g_1, g_2, order) = (group.gen1(), group.gen2(), group.order())
+
+
+def test_multi_pair():
+    """the multi-pairing is the product of the pairings, and the empty product is the identity"""
+    assert multi_pair(group, []) == GTElem.one(group) and pairing_check(group, [])
+    pairs = [(order.random() * g_1, order.random() * g_2) for _ in range(4)]
+    product = group.pair(*pairs[0])
+    for pair in pairs[1:]:
+        product = product.mul(group.pair(*pair))
+    assert multi_pair(group, pairs) == product
+    assert multi_pair(group, pairs[:1]) == group.pair(*pairs[0])
+
+
+def test_multi_pair_infinity_and_cancelling_pairs():
+    """points at infinity and pairs that cancel each other do not change the product"""
+    (P, Q) = (order.random() * g_1, order.random() * g_2)
+    (R, S) = (order.random() * g_1, order.random() * g_2)
+    (inf_G1, inf_G2) = (G1Elem.inf(group), G2Elem.inf(group))
+    assert multi_pair(group, [(inf_G1, Q), (P, inf_G2)]) == GTElem.one(group)
+    assert multi_pair(group, [(inf_G1, Q), (R, S), (P, inf_G2)]) == group.pair(R, S)
+    assert pairing_check(group, [(P, Q), (P.neg(), Q)])
+    assert multi_pair(group, [(P, Q), (R, S), (P.neg(), Q)]) == group.pair(R, S)
+    ## pairs with the same G2 point are merged but keep their product
+    assert multi_pair(group, [(P, Q), (R, S), (R, Q)]) == group.pair(P + R, Q).mul(group.pair(R, S))
+
+
+def test_pairing_check():
+    """e(a * g_1, b * g_2) * e(-(a * b) * g_1, g_2) is one, and not for any other exponent"""
+    (a, b) = (order.random(), order.random())
+    assert pairing_check(group, [(a * g_1, b * g_2), (((a * b % order) * g_1).neg(), g_2)])
+    assert not pairing_check(group, [(a * g_1, b * g_2), ((((a * b + 1) % order) * g_1).neg(), g_2)])
+
+
+def naive_msm(points, scalars):
+    ret = scalars[0] * points[0]
+    for point, scalar in zip(points[1:], scalars[1:]):
+        ret = ret + scalar * point
+    return ret
+
+
+def test_msm():
+    """msm is the sum of the scalar multiplications, in G1 and G2, with Bn and int scalars"""
+    for gen in (g_1, g_2):
+        points = [order.random() * gen for _ in range(6)]
+        scalars = [order.random() for _ in range(6)]
+        assert msm(points, scalars) == naive_msm(points, scalars)
+        ## only the first len(scalars) points are used, and int scalars are reduced modulo order
+        assert msm(points, scalars[:3]) == naive_msm(points[:3], scalars[:3])
+        assert msm(points, [int(order) + 2, -1]) == naive_msm(points[:2], [2, order - 1])
+
+
+def test_msm_more_scalars_than_points():
+    """more scalars than points is an error, e.g. a set of t messages for parameters of max cardinality t"""
+    points = [order.random() * g_1 for _ in range(2)]
+    with pytest.raises(ValueError):
+        msm(points, [order.random() for _ in range(3)])
+    scheme = SetCommitment(max_cardinal=3)
+    (pp, alpha) = scheme.setup()
+    with pytest.raises(ValueError):
+        scheme.commit_set(pp, ["a = 1", "b = 2", "c = 3"])
+
+
+def test_msm_pippenger(monkeypatch):
+    """the bucket method gives the same sums as the native multi-exponentiation"""
+    monkeypatch.setattr(core.util, "PIPPENGER_THRESHOLD", 2)
+    for gen in (g_1, g_2):
+        points = [order.random() * gen for _ in range(40)]
+        scalars = [order.random() for _ in range(40)]
+        assert msm(points, scalars) == naive_msm(points, scalars)
+        assert msm(points[:3], [0, 1, 0]) == points[1]
+        assert msm(points[:2], [0, 0]).isinf()
@@ -0,0 +1,75 @@
+"""
+This is a Test (and example of how it works) of the binary wire format: wire.py
+This file contains unit tests for the functions in wire.py.
+It tests that public parameters, credentials and proofs survive encoding and decoding.
+"""
+
+from io import BytesIO
+from core.dac import DAC
+from core.wire import encode, decode, iter_records, PP_DAC, CRED, UPDATE_KEY, PROOF, PROOF_NYM, DELEGATION
+
+message1_str = ["age = 30", "name = Alice ", "driver license = 12"]
+message2_str = ["genther = male", "componey = XX ", "driver license type = B"]
+Attr_vector = [message1_str, message2_str]
+D = [["age = 30", "name = Alice "], ["genther = male", "componey = XX "]]
+
+
+def setup_module(module):
+    print("__________Setup___Test wire format________")
+    global dac, pp_dac, sk_ca
+    dac = DAC(t=5, l_message=10)
+    (pp_dac, proof_vk, vk_stm, sk_ca, proof_alpha, alpha_stm) = dac.setup()
+
+
+def test_pp_dac():
+    """encode and decode the public parameters, and use the decoded ones"""
+    kind, pp_decoded = decode(encode(PP_DAC, pp_dac))
+    assert kind == PP_DAC
+    (pp_sign, pp_zkp, pp_nizkp, vk_ca) = pp_decoded
+    assert pp_sign[:5] == pp_dac[0][:5] and pp_zkp[1:] == pp_dac[1][1:] and vk_ca == pp_dac[3]
+
+    (usk, upk) = dac.user_keygen(pp_decoded)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_decoded, usk, upk)
+    cred = dac.issue_cred(pp_decoded, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=None, proof_nym_u=proof_nym_u)
+    assert dac.spseq_uc.verify(pp_sign, vk_ca, nym_u, cred[1], cred[0])
+
+
+def test_cred_and_proof():
+    """encode and decode a credential with update key and a proof, and check the decoded proof"""
+    (usk, upk) = dac.user_keygen(pp_dac)
+    (nym_u, secret_nym_u, proof_nym_u) = dac.nym_gen(pp_dac, usk, upk)
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=3, proof_nym_u=proof_nym_u)
+    assert decode(encode(CRED, cred), kind=CRED)[1] == cred
+    assert decode(encode(UPDATE_KEY, cred[1]), kind=UPDATE_KEY)[1] == cred[1]
+    ## a randomized update key is encoded with its factor applied
+    rndmz_update_key = cred[1].randomize(pp_dac[0][4].random(), pp_dac[0][4])
+    decoded = decode(encode(UPDATE_KEY, rndmz_update_key))[1]
+    assert decoded.factor == 1 and decoded == rndmz_update_key and decoded.points[0] != cred[1].points[0]
+
+    cred = dac.issue_cred(pp_dac, attr_vector=Attr_vector, sk=sk_ca, nym_u=nym_u, k_prime=None, proof_nym_u=proof_nym_u)
+    proof = dac.proof_cred(pp_dac, nym_R=nym_u, aux_R=secret_nym_u, cred_R=cred, Attr=Attr_vector, D=D)
+    record = encode(PROOF, proof)
+    kind, proof_decoded = decode(memoryview(record), kind=PROOF)
+    assert dac.verify_proof(pp_dac, proof_decoded, D)
+    assert decode(encode(PROOF_NYM, proof[4]))[1] == proof[4]
+
+
+def test_iter_records():
+    """read a stream of concatenated records and reject malformed ones"""
+    records = [encode(PROOF_NYM, dac.nym_gen(pp_dac, *dac.user_keygen(pp_dac))[2]) for _ in range(3)]
+    stream = b"".join(records)
+    assert [obj for kind, obj in iter_records(stream)] == [decode(record)[1] for record in records]
+    assert len(list(iter_records(BytesIO(stream)))) == 3
+
+    for bad in [b"XX" + records[0][2:], records[0][:2] + b"\x09" + records[0][3:], records[0][:-1]]:
+        try:
+            decode(bad)
+            assert False, "a malformed record is decoded"
+        except ValueError:
+            pass
+
+
+def test_strings():
+    """attributes are encoded as UTF-8 strings"""
+    attributes = [["age = 30", "name = Zoë"], []]
+    assert decode(encode(DELEGATION, (attributes, None)), DELEGATION) == (DELEGATION, (attributes, None))
@@ -4,6 +4,7 @@ This is a Test (and example of how it works) of ZKP protocols
 
 from bplib.bp import BpGroup
 from core.zkp import ZKP_Schnorr, ZKP_Schnorr_FS, Damgard_Transfor
+from core.transcript import Transcript
 
 def setup_module(module):
     print("__________Setup__Test ZKP___________")
@@ -56,7 +57,7 @@ def test_interact_prove():
     (W_element, w_random) = announce
 
     # verifier creates a challenge
-    state = ['schnorr', g, stm, W_element.__hash__()]
+    state = ['schnorr', g, stm, W_element]
     challenge = Schnorr.challenge(state)
 
     # prover creates a respoonse (or proof)
@@ -78,7 +79,7 @@ def test_Damgard_Transfor():
     (open_randomness, announce_randomnes, announce_element) = pedersen_open
 
     # get s challenge
-    state = ['schnorr', g, h, pedersen_commit.__hash__()]
+    state = ['schnorr', g, h, pedersen_commit]
     challenge = Damgard.challenge(state)
 
     # prover creates a respoonse (or proof)
@@ -86,3 +87,46 @@ def test_Damgard_Transfor():
 
     # verfiy the proof for statement
     assert(Damgard.verify(challenge, pedersen_open, pedersen_commit, h, response))
+
+
+def test_transcript():
+    """challenges of a transcript depend on the order and framing of the values, and forks do not change it"""
+    (G, g, o, h) = pp_pedersen
+    transcript = Transcript(b"test").absorb(g, h)
+    assert transcript.challenge() == Transcript(b"test").absorb(g).absorb(h).challenge()
+    assert transcript.challenge() != Transcript(b"test").absorb([g, h]).challenge()
+    assert transcript.challenge() != Transcript(b"test").absorb(h, g).challenge()
+    assert Transcript(b"test").absorb("ab", "c").challenge() != Transcript(b"test").absorb("a", "bc").challenge()
+    c = transcript.challenge(o)
+    forked = transcript.fork("announcement").absorb(o.random() * g)
+    assert transcript.challenge(o) == c and forked.challenge(o) != c and c < o
+
+
+def test_verify_batch():
+    """verify many Schnorr and Damgard proofs at once and find the invalid ones"""
+    (G, g, o, h) = pp_pedersen
+    proofs = []
+    for i in range(5):
+        x = o.random()
+        stm = x * g
+        (pedersen_commit, pedersen_open) = Damgard.announce()
+        challenge = Damgard.challenge(['schnorr', g, stm, pedersen_commit])
+        response = Damgard.response(challenge, pedersen_open[1], stm, x)
+        proofs.append((challenge, pedersen_open, pedersen_commit, stm, response))
+    assert Damgard.verify_batch(proofs) == [True] * 5
+
+    ## a wrong response and a wrong opening of the announcement
+    (challenge, pedersen_open, pedersen_commit, stm, response) = proofs[1]
+    proofs[1] = (challenge, pedersen_open, pedersen_commit, stm, response + 1)
+    (challenge, pedersen_open, pedersen_commit, stm, response) = proofs[4]
+    proofs[4] = (challenge, (pedersen_open[0] + 1, pedersen_open[1], pedersen_open[2]), pedersen_commit, stm, response)
+    assert Damgard.verify_batch(proofs) == [True, False, True, True, False]
+    assert [Damgard.verify(*proof) for proof in proofs] == [True, False, True, True, False]
+
+    (G, g, o) = pp
+    x = o.random()
+    stm = x * g
+    (W_element, w_random) = Schnorr.announce()
+    challenge = Schnorr.challenge(['schnorr', g, stm, W_element])
+    proof = (challenge, W_element, stm, Schnorr.response(challenge, w_random, stm, x))
+    assert Schnorr.verify_batch([proof, proof[:3] + (proof[3] + 1,)]) == [True, False]
@@ -0,0 +1,28 @@
+"""
+This file contains unit tests for the vectors of scalars in Z_p: zp.py
+"""
+
+from core.zp import ZpVector, batch_inverse
+
+p = 2 ** 127 - 1
+
+
+def test_vector_ops():
+    a = ZpVector([1, 2, -3], p)
+    b = ZpVector([4, 5, 6], p)
+    assert a == [1, 2, p - 3]
+    assert a.add(b) == [5, 7, 3] and b.sub(a) == [3, 3, 9]
+    assert a.mul(b) == [4, 10, p - 18] and a.scale(2) == [2, 4, p - 6]
+    assert a.inner(b) == (4 + 10 - 18) % p
+    assert ZpVector.combine([[1, 1], [1, 2, 3]], [2, 3], p) == [5, 8, 9]
+
+
+def test_batch_inverse():
+    values = [3, 5, p - 1, 12345678901234567890]
+    assert [v * inv % p for v, inv in zip(values, batch_inverse(values, p))] == [1, 1, 1, 1]
+    assert ZpVector(values, p).inverse().mul(values) == [1, 1, 1, 1]
+    try:
+        batch_inverse([1, 0], p)
+        assert False
+    except ZeroDivisionError:
+        pass